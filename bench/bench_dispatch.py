@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Per-request dispatch overhead: inspect.getmembers versus the static table.
+
+The flowlauncher base class found the requested method by building a dict of
+every bound method with ``inspect.getmembers`` on each request; main.py now
+looks it up in ``RPC_TABLE``, built once at import. This times both lookups
+and a full ``handle_request`` round trip for a method that does no work.
+
+    python bench/bench_dispatch.py [--calls 2000]
+"""
+
+import argparse
+import inspect
+import os
+import time
+
+from common import temp_dir, write_settings
+
+
+def per_call_us(func, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    with temp_dir() as root:
+        os.environ["FOLDERLIST_SETTINGS"] = write_settings(os.path.join(root, "settings.json"), {})
+        import main as plugin_main
+        plugin = plugin_main.FolderListPlugin(dispatch=False)
+
+        def getmembers_lookup():
+            return dict(inspect.getmembers(plugin, predicate=inspect.ismethod))["context_menu"]
+
+        def table_lookup():
+            return plugin_main.RPC_TABLE["context_menu"]
+
+        request = {"method": "context_menu", "parameters": [None]}
+        timings = (
+            ("inspect.getmembers lookup", per_call_us(getmembers_lookup, args.calls)),
+            ("RPC_TABLE lookup", per_call_us(table_lookup, args.calls)),
+            ("handle_request", per_call_us(lambda: plugin.handle_request(request), args.calls)),
+        )
+        for label, us in timings:
+            print(f"{label:<28} {us:10.3f}us per request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Microbenchmarks for folderlist.fuzzy.
+
+Generates a synthetic set of file-like names (kebab-case, snake_case,
+camelCase, numbered) and reports:
+
+- FuzzyIndex build time,
+- per-query candidate prefiltering (``matches``) and prefiltering plus
+  scoring (``search``) in fuzzy, substring and prefix mode,
+- single-name ``score`` throughput, as used when streaming uncached folders.
+
+    python bench/bench_fuzzy.py [--names 100000] [--repeat 5]
+"""
+
+import argparse
+import random
+import time
+
+import common  # noqa: F401  (puts the plugin on sys.path)
+
+from folderlist import fuzzy
+from folderlist.fuzzy import FuzzyIndex
+
+WORDS = ("throne", "lang", "frontend", "config", "loader", "kitten", "video", "util",
+         "tailwind", "project", "server", "index", "report", "backup", "draft", "final")
+EXTENSIONS = ("", ".js", ".ts", ".json", ".mp4", ".txt", ".md")
+
+QUERIES = (
+    ("tlf", "fuzzy"),
+    ("cfgldr", "fuzzy"),
+    ("kitten", "substring"),
+    ("report_final", "substring"),
+    ("tailwind", "prefix"),
+    ("zzq", "fuzzy"),
+)
+
+
+def synthetic_names(n, seed=0):
+    rng = random.Random(seed)
+    names = []
+    for i in range(n):
+        words = rng.sample(WORDS, rng.randint(1, 3))
+        style = i % 3
+        if style == 0:
+            name = "-".join(words)
+        elif style == 1:
+            name = "_".join(words)
+        else:
+            name = words[0] + "".join(word.title() for word in words[1:])
+        # Unique, like the names in one directory
+        names.append(f"{name}{i}{rng.choice(EXTENSIONS)}")
+    return names
+
+
+def best_ms(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--names", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    names = synthetic_names(args.names)
+
+    def build():
+        index = FuzzyIndex(names)
+        # Also builds the lazy key -> index and key end -> index maps
+        index.prefix_matches("x")
+        index.substring_matches("x")
+        return index
+
+    build_ms, index = best_ms(build, args.repeat)
+    print(f"{args.names} names, index build {build_ms:.2f}ms")
+    print(f"{'query':<14} {'mode':<10} {'matches':>8} {'prefilter':>10} {'search':>10}")
+    for query, mode in QUERIES:
+        filter_ms, matched = best_ms(lambda: index.matches(query, mode), args.repeat)
+        search_ms, _ = best_ms(lambda: index.search(query, mode), args.repeat)
+        print(f"{query:<14} {mode:<10} {len(matched):>8} {filter_ms:8.2f}ms {search_ms:8.2f}ms")
+
+    sample = names[:10_000]
+    single_ms, _ = best_ms(lambda: [fuzzy.score("tlf", name) for name in sample], args.repeat)
+    print(f"single-name score: {single_ms / len(sample) * 1000:.2f}us per name")
+
+
+if __name__ == "__main__":
+    main()
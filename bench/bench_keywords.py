@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Compare the linear keyword scan with KeywordIndex prefix lookups.
+
+Generates 10k and 100k project-like keywords and times the typed prefixes
+of a few keywords against both the old list comprehension over
+``settings["keywords"]`` and ``KeywordIndex.with_prefix``, plus the
+one-time index build.
+
+    python bench/bench_keywords.py [--repeat 5]
+"""
+
+import argparse
+import random
+import time
+
+import common  # noqa: F401  (puts the plugin on sys.path)
+
+from folderlist.keywords import KeywordIndex
+
+SIZES = (10_000, 100_000)
+SYLLABLES = ("ka", "to", "ri", "mon", "lang", "front", "end", "api", "web", "core", "db", "ui")
+
+
+def synthetic_keywords(n, seed=0):
+    rng = random.Random(seed)
+    keywords = {}
+    while len(keywords) < n:
+        keyword = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        keyword += str(rng.randrange(100))
+        keywords[keyword] = f"C:/Projects/{keyword}"
+    return keywords
+
+
+def linear_scan(keywords, query):
+    return [k for k in keywords.keys() if k.startswith(query.lower())]
+
+
+def best_us(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for n in SIZES:
+        keywords = synthetic_keywords(n)
+        build_us = best_us(lambda: KeywordIndex(keywords), args.repeat)
+        index = KeywordIndex(keywords)
+        target = sorted(keywords)[n // 2]
+        prefixes = [target[:i] for i in range(1, len(target) + 1)]
+
+        scan_total = index_total = 0.0
+        for prefix in prefixes:
+            assert sorted(linear_scan(keywords, prefix)) == index.with_prefix(prefix)
+            scan_total += best_us(lambda: linear_scan(keywords, prefix), args.repeat)
+            index_total += best_us(lambda: index.with_prefix(prefix), args.repeat)
+
+        print(f"{n} keywords: index build {build_us / 1000:.2f}ms; "
+              f"typing {target!r} ({len(prefixes)} lookups): "
+              f"scan {scan_total / len(prefixes):9.1f}us/lookup, "
+              f"index {index_total / len(prefixes):7.1f}us/lookup")
+
+
+if __name__ == "__main__":
+    main()
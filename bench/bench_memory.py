@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Memory held by a large folder listing, measured with tracemalloc.
+
+Lists a synthetic folder and builds one page of results three ways:
+
+- dicts: a result dict with nested JsonRPCAction and parameters for every
+  entry, then a full sort, as main.py originally listed folders,
+- namedtuple: tuple entries each holding their full path (the previous
+  Entry), with only the visible page turned into dicts,
+- slots: the current ``__slots__`` Entry, which shares its parent's path.
+
+For each it reports the memory still held by the listing afterwards (what
+the listing cache keeps) and the peak while producing the page.
+
+    python bench/bench_memory.py [--files 100000] [--page 100]
+"""
+
+import argparse
+import os
+import tracemalloc
+from typing import NamedTuple
+
+from common import make_flat_tree, temp_dir
+
+from folderlist.listing import scan_dir
+from folderlist.ranking import top_entries
+
+
+class TupleEntry(NamedTuple):
+    name: str
+    path: str
+    is_dir: bool
+    sort_key: str
+
+
+def result_dict(name, path, is_dir):
+    return {
+        "Title": name,
+        "SubTitle": f"{'Folder' if is_dir else 'File'}: {path}",
+        "IcoPath": "images/folder.png" if is_dir else "images/file.png",
+        "JsonRPCAction": {
+            "method": "open_path",
+            "parameters": [path],
+            "dontHideAfterAction": False
+        }
+    }
+
+
+def list_dicts(path, page):
+    results = []
+    with os.scandir(path) as it:
+        for item in it:
+            results.append(result_dict(item.name, item.path, item.is_dir()))
+    results.sort(key=lambda result: (result["IcoPath"] != "images/folder.png", result["Title"].lower()))
+    return results, results[:page]
+
+
+def list_namedtuples(path, page):
+    with os.scandir(path) as it:
+        entries = [TupleEntry(item.name, item.path, item.is_dir(), item.name.casefold()) for item in it]
+    return entries, [result_dict(e.name, e.path, e.is_dir) for e in top_entries(entries, page)]
+
+
+def list_slots(path, page):
+    entries = scan_dir(path)
+    return entries, [result_dict(e.name, e.path, e.is_dir) for e in top_entries(entries, page)]
+
+
+def measure(func, path, page):
+    tracemalloc.start()
+    listing, results = func(path, page)
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del listing, results
+    return held, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--page", type=int, default=100)
+    args = parser.parse_args()
+
+    with temp_dir() as tmp:
+        path = make_flat_tree(os.path.join(tmp, "flat"), args.files, args.files // 10)
+        print(f"{args.files} files + {args.files // 10} folders, page of {args.page}")
+        for label, func in (("dicts", list_dicts), ("namedtuple", list_namedtuples), ("slots", list_slots)):
+            held, peak = measure(func, path, args.page)
+            print(f"{label:<12} held {held / 2**20:8.2f}MiB  peak {peak / 2**20:8.2f}MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Compare full sorting with heap-based top-K selection of listing entries.
+
+Builds synthetic directory listings of 1k/10k/100k entries (10% folders,
+shuffled names) in memory and times the old "split, sort both with
+``.lower()``, concatenate" approach against ``ranking.top_entries`` for the
+first page of results.
+
+    python bench/bench_rank.py [--k 100] [--repeat 5]
+"""
+
+import argparse
+import random
+import time
+
+import common  # noqa: F401  (puts the plugin on sys.path)
+
+from folderlist.listing import Entry
+from folderlist.ranking import top_entries
+
+SIZES = (1_000, 10_000, 100_000)
+
+
+def synthetic_listing(n, seed=0):
+    rng = random.Random(seed)
+    entries = []
+    for i in range(n):
+        is_dir = i % 10 == 0
+        name = f"{rng.choice(['Alpha', 'beta', 'Gamma', 'delta'])}_{rng.randrange(10**9):09d}"
+        if not is_dir:
+            name += ".txt"
+        entries.append(Entry(name, "/synthetic", is_dir, name.casefold()))
+    rng.shuffle(entries)
+    return entries
+
+
+def full_sort(entries, k):
+    folders = [entry for entry in entries if entry.is_dir]
+    files = [entry for entry in entries if not entry.is_dir]
+    folders.sort(key=lambda entry: entry.name.lower())
+    files.sort(key=lambda entry: entry.name.lower())
+    return (folders + files)[:k]
+
+
+def best_time(func, entries, k, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(entries, k)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--k", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'entries':>8}  {'full sort':>10}  {'top-k':>10}  speedup")
+    for n in SIZES:
+        entries = synthetic_listing(n)
+        assert full_sort(entries, args.k) == top_entries(entries, args.k)
+        sort_ms = best_time(full_sort, entries, args.k, args.repeat)
+        topk_ms = best_time(top_entries, entries, args.k, args.repeat)
+        print(f"{n:>8}  {sort_ms:8.2f}ms  {topk_ms:8.2f}ms  {sort_ms / topk_ms:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Compare the old ``os.listdir`` + ``os.path.isdir`` enumeration with scan_dir.
+
+Counts the filesystem calls each approach makes through the ``os`` module
+(``os.path.isdir`` goes through ``os.stat``) and times both over a synthetic
+directory. If ``strace`` is available, ``--strace`` additionally reports the
+real syscall counts of each approach.
+
+    python bench/bench_scandir.py [--files 20000] [--dirs 2000] [--strace]
+"""
+
+import argparse
+import collections
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+from common import BENCH_DIR, make_flat_tree, temp_dir
+
+from folderlist.listing import scan_dir
+
+COUNTED = ("stat", "lstat", "listdir", "scandir")
+
+
+def legacy_listing(path):
+    entries = []
+    for item in os.listdir(path):
+        full_path = os.path.join(path, item)
+        entries.append((item, full_path, os.path.isdir(full_path)))
+    return entries
+
+
+def count_calls(func, path):
+    counts = collections.Counter()
+    originals = {name: getattr(os, name) for name in COUNTED}
+
+    def wrap(name, original):
+        def counted(*args, **kwargs):
+            counts[name] += 1
+            return original(*args, **kwargs)
+        return counted
+
+    for name, original in originals.items():
+        setattr(os, name, wrap(name, original))
+    try:
+        func(path)
+    finally:
+        for name, original in originals.items():
+            setattr(os, name, original)
+    return counts
+
+
+def time_calls(func, path, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def strace_counts(approach, path):
+    """Run one approach in a child under ``strace -c`` and return its summary."""
+    code = (f"import sys; sys.path.insert(0, {BENCH_DIR!r}); "
+            f"import bench_scandir as b; b.{approach}({path!r})")
+    result = subprocess.run(
+        ["strace", "-f", "-c", "-e", "trace=%file,getdents64", sys.executable, "-c", code],
+        stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True)
+    return result.stderr
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=20000)
+    parser.add_argument("--dirs", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--strace", action="store_true")
+    args = parser.parse_args()
+
+    with temp_dir() as tmp:
+        path = make_flat_tree(os.path.join(tmp, "flat"), args.files, args.dirs)
+        print(f"{args.files} files + {args.dirs} folders")
+        for label, func in (("listdir + isdir", legacy_listing), ("scan_dir", scan_dir)):
+            counts = count_calls(func, path)
+            elapsed = time_calls(func, path, args.repeat)
+            calls = ", ".join(f"{name}={counts[name]}" for name in COUNTED)
+            print(f"{label:<16} best={elapsed * 1000:8.2f}ms  {calls}")
+
+        if args.strace:
+            if shutil.which("strace") is None:
+                print("strace not found, skipping syscall trace")
+                return
+            for approach in ("legacy_listing", "scan_dir"):
+                print(f"--- strace: {approach}")
+                print(strace_counts(approach, path))
+
+
+if __name__ == "__main__":
+    main()
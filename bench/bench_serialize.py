@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Response serialization: per-entry dicts with json.dumps versus fragments.
+
+Builds and encodes a ``{"result": [...]}`` payload of folder entries (half of
+them with non-ASCII names) the way main.py used to (a dict per entry, then
+``json.dumps`` with its defaults) and through ``folderlist.serialize``
+(pre-encoded entry fragments, compact UTF-8), with the stdlib encoder and,
+when it is installed, orjson.
+
+    python bench/bench_serialize.py [--sizes 1000 10000] [--repeat 7]
+"""
+
+import argparse
+import json
+import time
+
+import common  # noqa: F401  (puts the plugin on sys.path)
+
+from folderlist import serialize
+
+
+def synthetic_entries(n):
+    entries = []
+    for i in range(n):
+        name = f"фото_{i} 日本語.jpg" if i % 2 else f"project_{i}_final.mp4"
+        entries.append((name, f"C:\\Users\\me\\Pictures\\{name}", i % 5 == 0, 10 if i % 5 == 0 else 0))
+    return entries
+
+
+def legacy(entries):
+    results = [{
+        "Title": name,
+        "SubTitle": f"{'Folder' if is_dir else 'File'}: {path}",
+        "IcoPath": "images/folder.png" if is_dir else "images/file.png",
+        "JsonRPCAction": {
+            "method": "open_path",
+            "parameters": [path],
+            "dontHideAfterAction": False
+        },
+        "Score": score
+    } for name, path, is_dir, score in entries]
+    return (json.dumps({"result": results, "debugMessage": ""}) + "\n").encode("utf-8")
+
+
+def fragments(entries):
+    results = [serialize.entry_fragment(name, path, is_dir, score) for name, path, is_dir, score in entries]
+    return serialize.encode({"result": results, "debugMessage": ""})
+
+
+def best_ms(func, entries, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = func(entries)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, len(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    orjson = serialize.orjson if serialize.use_fast_encoder() else None
+    variants = [("dicts + json.dumps", legacy, None), ("fragments, stdlib", fragments, None)]
+    if orjson is not None:
+        variants.append(("fragments, orjson", fragments, orjson))
+
+    print(f"{'results':>8}  {'variant':<20} {'build+encode':>12} {'bytes':>10}")
+    for size in args.sizes:
+        entries = synthetic_entries(size)
+        assert json.loads(legacy(entries)) == json.loads(fragments(entries))
+        for label, func, encoder in variants:
+            serialize.orjson = encoder
+            elapsed, size_bytes = best_ms(func, entries, args.repeat)
+            print(f"{size:>8}  {label:<20} {elapsed:10.2f}ms {size_bytes:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Startup import budget for main.py, measured with ``python -X importtime``.
+
+Flow Launcher starts a fresh interpreter per keystroke, so every module
+main.py imports is paid on every query. For each scenario this runs main.py
+once per repeat with ``-X importtime`` and reports:
+
+- the import time attributable to the plugin (top-level imports that a bare
+  ``python -c pass`` does not perform),
+- the process wall time,
+- the most expensive top-level imports.
+
+It exits with status 1 if the median plugin import time of any scenario
+exceeds ``--max-import-ms``, or if a module that the query path must never
+load (PyQt5, pyperclip, pathlib, ...) gets imported, so it can run as a
+regression check.
+
+    python bench/bench_startup.py [--repeat 7] [--max-import-ms 60] [--top 8]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from common import MAIN_PY, make_flat_tree, percentile, plugin_env, temp_dir, write_settings
+
+# Modules the query path has no use for; importing any of them is a regression
+FORBIDDEN = ("PyQt5", "pyperclip", "pathlib", "csv", "concurrent", "inspect", "flowlauncher", "orjson")
+
+
+def parse_importtime(stderr: str):
+    """``(name, depth, cumulative_us)`` for every ``-X importtime`` line."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue  # header line
+        raw_name = fields[2].rstrip()
+        name = raw_name.lstrip()
+        depth = (len(raw_name) - len(name) - 1) // 2
+        rows.append((name, depth, int(fields[1])))
+    return rows
+
+
+def run_importtime(args, env=None):
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime"] + args, env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               text=True, check=True)
+    return time.perf_counter() - start, parse_importtime(completed.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--max-import-ms", type=float, default=60.0)
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    _, baseline_rows = run_importtime(["-c", "pass"])
+    baseline = {name for name, _, _ in baseline_rows}
+
+    failed = False
+    with temp_dir() as root:
+        folder = make_flat_tree(os.path.join(root, "docs"), 200, 20)
+        env = plugin_env(write_settings(os.path.join(root, "settings.json"), {"docs": folder}))
+        scenarios = (
+            ("list keywords", ""),
+            ("keyword", "docs"),
+            ("keyword + filter", "docs file_00"),
+            ("path", folder),
+        )
+        print(f"{'scenario':<18} {'imports p50':>12} {'wall p50':>10}  slowest top-level imports")
+        for label, query in scenarios:
+            request = json.dumps({"method": "query", "parameters": [query]})
+            import_ms = []
+            wall_ms = []
+            slowest = {}
+            loaded = set()
+            for _ in range(args.repeat):
+                wall, rows = run_importtime([MAIN_PY, request], env)
+                own = [(name, us) for name, depth, us in rows if depth == 0 and name not in baseline]
+                import_ms.append(sum(us for _, us in own) / 1000)
+                wall_ms.append(wall * 1000)
+                for name, us in own:
+                    slowest[name] = min(us, slowest.get(name, us))
+                loaded.update(name for name, _, _ in rows)
+
+            median = percentile(import_ms, 50)
+            top = sorted(slowest.items(), key=lambda item: -item[1])[:args.top]
+            print(f"{label:<18} {median:10.2f}ms {percentile(wall_ms, 50):8.1f}ms  "
+                  + ", ".join(f"{name} {us / 1000:.1f}" for name, us in top))
+
+            forbidden = sorted(name for name in loaded - baseline
+                               if name.split(".")[0] in FORBIDDEN)
+            if forbidden:
+                print(f"  FAIL: imported {', '.join(forbidden)}")
+                failed = True
+            if median > args.max_import_ms:
+                print(f"  FAIL: {median:.2f}ms exceeds the {args.max_import_ms:.0f}ms import budget")
+                failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
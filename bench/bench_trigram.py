@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Time substring searches of a trigram index against a scan of the tree index.
+
+Builds an in-memory tree index of ``--names`` synthetic names (about 25 per
+folder, made of random syllables with numbers and extensions), writes its
+trigram file to a temp dir and maps it, then times a set of queries from a
+single hit to tens of thousands:
+
+- ``ids``: ``TrigramIndex.search`` alone (posting lists, intersection and
+  verification),
+- ``trigram``: ``TreeIndex.search`` through the trigram index, i.e. ids
+  plus turning the hits into entries,
+- ``scan``: ``TreeIndex.search`` without it (per-folder scan of the joined
+  names).
+
+Exits non-zero if the median ``ids`` time of a selective query (one
+matching under 1% of the names) exceeds the budget. Broad queries are
+reported too, but every one of their hits still has to be verified and
+returned, so their time grows with the hit count rather than the index.
+
+    python bench/bench_trigram.py [--names 500000] [--repeat 5] [--budget-ms 10]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from array import array
+
+from common import percentile, temp_dir
+
+from folderlist.filtering import parse_filter
+from folderlist.tree_index import TreeIndex
+from folderlist.trigram import open_trigrams, write_trigrams
+
+SYLLABLES = ("ka", "lo", "mi", "ten", "rus", "ba", "vo", "xel", "qu", "dri", "on", "pa", "zen", "ti")
+EXTENSIONS = (".js", ".ts", ".json", ".md", ".png", ".txt", ".d.ts", "")
+NAMES_PER_FOLDER = 25
+
+# Queries matching fewer names than this fraction are held to the budget
+SELECTIVE_FRACTION = 0.01
+
+
+def synthetic_index(n_names, seed=0):
+    rng = random.Random(seed)
+    dirs = []
+    made = 0
+    folder = 0
+    while made < n_names:
+        count = min(NAMES_PER_FOLDER, n_names - made)
+        names = []
+        for _ in range(count):
+            word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+            names.append(f"{word.capitalize()}_{rng.randrange(100_000)}{rng.choice(EXTENSIONS)}")
+        keys = [name.casefold() for name in names]
+        zeros = array("q", [0] * count).tobytes()
+        dirs.append((f"/synthetic/{folder:06d}", 2, 0, "\0".join(names), "\0".join(keys),
+                     bytes(count), zeros, zeros))
+        made += count
+        folder += 1
+    return TreeIndex("/synthetic", 1, True, made, dirs)
+
+
+def best_of(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return result, percentile([s * 1000 for s in samples], 50)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--names", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    index = synthetic_index(args.names)
+    rng = random.Random(1)
+    sample_name = rng.choice(rng.choice(index.dirs)[4].split("\0"))
+    queries = [
+        sample_name,  # one or a few hits
+        sample_name.split("_")[1][:4],  # digits: a few dozen
+        "xelten",  # two syllables: thousands
+        "^drika",  # prefix
+        ".d.ts",  # common extension: tens of thousands
+        "zzq",  # no hit
+    ]
+
+    with temp_dir() as root:
+        index_file = os.path.join(root, "synthetic.tree")
+        start = time.perf_counter()
+        path = write_trigrams(index_file, index.built_ns, (record[4] for record in index.dirs))
+        print(f"{args.names} names: trigram file {os.path.getsize(path) / 2**20:.1f}MiB "
+              f"built in {time.perf_counter() - start:.1f}s")
+        start = time.perf_counter()
+        trigrams = open_trigrams(path, index.built_ns)
+        print(f"mapped in {(time.perf_counter() - start) * 1000:.2f}ms")
+        with_trigrams = index._replace(trigrams=trigrams)
+
+        over_budget = []
+        print(f"{'query':<24} {'hits':>7} {'ids':>10} {'trigram':>10} {'scan':>10}")
+        for query in queries:
+            entry_filter = parse_filter(query)
+            ids, ids_ms = best_of(
+                lambda: trigrams.search(entry_filter.needle, entry_filter.mode == "prefix"), args.repeat)
+            hits, trigram_ms = best_of(lambda: sum(1 for _ in with_trigrams.search(entry_filter)), args.repeat)
+            scanned, scan_ms = best_of(lambda: sum(1 for _ in index.search(entry_filter)), args.repeat)
+            assert hits == scanned == len(ids), (query, hits, scanned, len(ids))
+            print(f"{query:<24} {hits:>7} {ids_ms:>8.2f}ms {trigram_ms:>8.2f}ms {scan_ms:>8.2f}ms")
+            if ids_ms > args.budget_ms and hits < args.names * SELECTIVE_FRACTION:
+                over_budget.append(query)
+
+    if over_budget:
+        sys.exit(f"over the {args.budget_ms:g}ms budget: {', '.join(over_budget)}")
+
+
+if __name__ == "__main__":
+    main()
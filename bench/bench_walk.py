@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Time recursive search over a node_modules-sized tree.
+
+Builds a synthetic package tree (``--packages`` packages with nested
+lib/util/dist folders, ~45 entries each) and searches it for ``--term``:
+once with a single-threaded ``os.walk`` that collects and sorts every match,
+and through ``pipeline.search_page`` with 1, 4 and 8 ``TreeWalker`` workers.
+Reports the time and the peak traced memory of each; the walk is timed
+without tracing, which slows allocation-heavy code disproportionately.
+
+    python bench/bench_walk.py [--packages 5000] [--term util] [--k 100]
+"""
+
+import argparse
+import os
+import time
+import tracemalloc
+
+from common import make_package_tree, temp_dir
+
+from folderlist.filtering import parse_filter
+from folderlist.pipeline import search_page
+from folderlist.stats import LatencyStats
+from folderlist.walker import WalkOptions
+
+WORKERS = (1, 4, 8)
+
+
+def os_walk_search(root, term, k):
+    matches = []
+    seen = 0
+    for parent, dirs, files in os.walk(root):
+        for name in dirs + files:
+            seen += 1
+            if term in name.casefold():
+                matches.append(os.path.join(parent, name))
+    matches.sort()
+    return matches[:k], seen
+
+
+def measure(func):
+    """Result and time of ``func()``, then its peak memory from a second, traced run."""
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--packages", type=int, default=5000)
+    parser.add_argument("--term", default="util")
+    parser.add_argument("--k", type=int, default=100)
+    args = parser.parse_args()
+
+    with temp_dir() as root:
+        start = time.perf_counter()
+        make_package_tree(root, args.packages)
+        print(f"built {args.packages} packages in {time.perf_counter() - start:.1f}s")
+        entry_filter = parse_filter(args.term)
+        latency = LatencyStats(None)
+
+        (_, seen), elapsed, peak = measure(lambda: os_walk_search(root, entry_filter.needle, args.k))
+        print(f"{'os.walk + sort':<24} {elapsed * 1000:9.1f}ms  {seen:>8} entries  "
+              f"peak {peak / 2**20:6.1f}MiB")
+        for workers in WORKERS:
+            options = WalkOptions(max_depth=64, max_entries=10**9, workers=workers, time_budget=600)
+            page, elapsed, peak = measure(
+                lambda: search_page(root, entry_filter, 0, args.k, options, latency))
+            print(f"{f'TreeWalker x{workers}':<24} {elapsed * 1000:9.1f}ms  {page.total:>8} matches  "
+                  f"peak {peak / 2**20:6.1f}MiB")
+
+
+if __name__ == "__main__":
+    main()
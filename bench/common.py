@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""Shared helpers for the benchmark scripts in this directory."""
+
+import json
+import os
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PLUGIN_DIR = os.path.dirname(BENCH_DIR)
+MAIN_PY = os.path.join(PLUGIN_DIR, "main.py")
+
+if PLUGIN_DIR not in sys.path:
+    sys.path.insert(0, PLUGIN_DIR)
+
+
+def make_flat_tree(root: str, n_files: int, n_dirs: int = 0) -> str:
+    """Create ``n_dirs`` folders and ``n_files`` empty files directly under root."""
+    os.makedirs(root, exist_ok=True)
+    for i in range(n_dirs):
+        os.mkdir(os.path.join(root, f"folder_{i:06d}"))
+    for i in range(n_files):
+        with open(os.path.join(root, f"file_{i:06d}.txt"), "w"):
+            pass
+    return root
+
+
+def make_deep_tree(root: str, depth: int, fanout: int = 3, files_per_dir: int = 5) -> str:
+    """A chain of ``depth`` nested folders, each with siblings and a few files."""
+    current = root
+    for level in range(depth):
+        os.makedirs(current, exist_ok=True)
+        for i in range(files_per_dir):
+            with open(os.path.join(current, f"level{level:03d}_file{i}.txt"), "w"):
+                pass
+        for i in range(1, fanout):
+            os.mkdir(os.path.join(current, f"sibling_{level:03d}_{i}"))
+        current = os.path.join(current, f"level_{level + 1:03d}")
+    os.makedirs(current, exist_ok=True)
+    return root
+
+
+def make_package_tree(root: str, n_packages: int, files_per_dir: int = 8) -> str:
+    """A ``node_modules``-like tree: packages with nested lib/util/dist folders of files."""
+    for p in range(n_packages):
+        package = os.path.join(root, "node_modules", f"@scope{p % 20}", f"package{p:05d}")
+        for sub in ("", "lib", os.path.join("lib", "util"), "dist", os.path.join("dist", "esm")):
+            folder = os.path.join(package, sub)
+            os.makedirs(folder, exist_ok=True)
+            for i in range(files_per_dir):
+                with open(os.path.join(folder, f"module{i}_{p:05d}.js"), "w"):
+                    pass
+    return root
+
+
+# Mixed-script pieces for long Unicode names (accents, CJK, Greek, emoji,
+# a combining mark and characters that casefold to longer strings)
+UNICODE_PIECES = ("Café", "日本語", "Ελληνικά", "Straße", "🐱", "naïve", "e\u0301", "İstanbul", "カタカナ")
+
+# Most filesystems limit a name to 255 bytes
+MAX_NAME_BYTES = 240
+
+
+def make_unicode_tree(root: str, n_files: int, n_dirs: int = 0) -> str:
+    """Files and folders with long names mixing scripts, each close to the name length limit."""
+    os.makedirs(root, exist_ok=True)
+    for i in range(n_dirs + n_files):
+        name = f"{i:06d}"
+        piece = 0
+        while True:
+            candidate = f"{name} {UNICODE_PIECES[(i + piece) % len(UNICODE_PIECES)]}"
+            if len(candidate.encode("utf-8")) > MAX_NAME_BYTES:
+                break
+            name = candidate
+            piece += 1
+        path = os.path.join(root, name)
+        if i < n_dirs:
+            os.mkdir(path)
+        else:
+            with open(path, "w"):
+                pass
+    return root
+
+
+def make_symlink_loop(root: str) -> bool:
+    """Folders whose symlinks point back up the tree; False if symlinks are not permitted."""
+    inner = os.path.join(root, "a", "b")
+    os.makedirs(inner, exist_ok=True)
+    try:
+        os.symlink(root, os.path.join(inner, "back_to_root"), target_is_directory=True)
+        os.symlink(os.path.join(root, "a"), os.path.join(root, "a", "self"), target_is_directory=True)
+    except (OSError, NotImplementedError):
+        return False
+    return True
+
+
+def write_settings(path: str, keywords: dict) -> str:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"keywords": keywords}, f)
+    return path
+
+
+def plugin_env(settings_file: str) -> dict:
+    """Environment for running main.py as a subprocess against test settings."""
+    env = dict(os.environ)
+    env["FOLDERLIST_SETTINGS"] = settings_file
+    return env
+
+
+def temp_dir(prefix: str = "folderlist-bench-") -> tempfile.TemporaryDirectory:
+    return tempfile.TemporaryDirectory(prefix=prefix)
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(label: str, samples_s) -> str:
+    ms = [s * 1000 for s in samples_s]
+    return (f"{label:<28} n={len(ms):<5} "
+            f"p50={percentile(ms, 50):9.3f}ms  "
+            f"p95={percentile(ms, 95):9.3f}ms  "
+            f"max={max(ms) if ms else 0:9.3f}ms")
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Replay a typed query sequence against main.py in one-shot and server mode.
+
+One-shot mode starts a fresh interpreter per keystroke, exactly like Flow
+Launcher's v1 protocol. Server mode starts ``main.py --server`` once and
+sends one JSON-RPC line per keystroke. Runs on plain Linux/Windows Python;
+Flow Launcher does not need to be installed.
+
+    python bench/replay_server.py [--word keyword] [--files 500] [--rounds 3]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from common import MAIN_PY, make_flat_tree, plugin_env, summarize, temp_dir, write_settings
+
+
+def typed_sequence(word: str):
+    """Prefixes produced by typing ``word`` then deleting it again."""
+    forward = [word[:i] for i in range(1, len(word) + 1)]
+    return forward + forward[-2::-1]
+
+
+def run_one_shot(queries, env):
+    samples = []
+    for q in queries:
+        request = json.dumps({"method": "query", "parameters": [q]})
+        start = time.perf_counter()
+        subprocess.run([sys.executable, MAIN_PY, request], env=env,
+                       stdout=subprocess.PIPE, check=True)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def run_server(queries, env):
+    proc = subprocess.Popen([sys.executable, MAIN_PY, "--server"], env=env,
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                            text=True, encoding="utf-8", bufsize=1)
+    samples = []
+    try:
+        for i, q in enumerate(queries):
+            line = json.dumps({"jsonrpc": "2.0", "id": i, "method": "query", "params": [q]})
+            start = time.perf_counter()
+            proc.stdin.write(line + "\n")
+            proc.stdin.flush()
+            response = json.loads(proc.stdout.readline())
+            samples.append(time.perf_counter() - start)
+            assert response["id"] == i, response
+    finally:
+        proc.stdin.close()
+        proc.wait()
+    return samples
+
+
+def run_in_process(queries, settings_file):
+    os.environ["FOLDERLIST_SETTINGS"] = settings_file
+    from main import FolderListPlugin
+    plugin = FolderListPlugin(dispatch=False)
+    samples = []
+    for q in queries:
+        start = time.perf_counter()
+        plugin.handle_request({"method": "query", "parameters": [q]})
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--word", default="keyword")
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    with temp_dir() as tmp:
+        target = make_flat_tree(os.path.join(tmp, "target"), args.files, n_dirs=args.files // 10)
+        settings = write_settings(os.path.join(tmp, "settings.json"), {args.word: target})
+        env = plugin_env(settings)
+        queries = typed_sequence(args.word) * args.rounds
+
+        print(f"{len(queries)} queries, {args.files} files in target directory")
+        print(summarize("one-shot (process/query)", run_one_shot(queries, env)))
+        print(summarize("server (round trip)", run_server(queries, env)))
+        print(summarize("in-process dispatch", run_in_process(queries, settings)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Replay recorded keystroke traces against synthetic directory trees.
+
+Queries are read, in the order they were typed, from the "Received query:"
+lines of folder_list_plugin.log (or ``--trace``). The keywords typed in the
+trace are mapped round-robin onto synthetic trees built in a temp dir:
+
+- flat: one folder with ``--flat-files`` files and a tenth as many folders,
+- deep: ``--depth`` nested folders with siblings and files on every level,
+- unicode: long names mixing scripts, accents, emoji and combining marks,
+- loop: folders with symlinks pointing back up the tree (left out where
+  symlinks are not permitted).
+
+Every query is replayed in-process through ``FolderListPlugin.handle_request``
+and the first ``--oneshot`` queries also through ``python main.py <request>``,
+like Flow Launcher's one-shot protocol. For each mode it reports the latency
+distribution, filesystem operations (audit events in-process, ``strace -c``
+syscall totals for one-shot runs with ``--strace``) and peak memory
+(tracemalloc in-process, max RSS of the one-shot processes). Needs only
+plain Python; Flow Launcher does not have to be installed.
+
+    python bench/replay_trace.py [--trace folder_list_plugin.log] [--flat-files 100000]
+                                 [--oneshot 60] [--strace]
+"""
+
+import argparse
+import collections
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from common import (MAIN_PY, PLUGIN_DIR, make_deep_tree, make_flat_tree, make_symlink_loop,
+                    make_unicode_tree, plugin_env, summarize, temp_dir, write_settings)
+
+QUERY_LINE = re.compile(r" - Received query: (.*)$")
+
+# Audit events counted as filesystem operations in-process
+FS_EVENTS = ("open", "os.scandir", "os.listdir", "os.rename", "os.remove", "os.mkdir")
+
+_fs_events = collections.Counter()
+_counting = False
+
+
+def _audit(event, _args):
+    if _counting and event in FS_EVENTS:
+        _fs_events[event] += 1
+
+
+def load_trace(path):
+    queries = []
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            match = QUERY_LINE.search(line.rstrip("\n"))
+            if match:
+                queries.append(match.group(1))
+    return queries
+
+
+def trace_keywords(queries):
+    """Words the trace used as keywords: fully typed words and those given a path with ':'."""
+    words = []
+    for query in queries:
+        word = query.split(":")[0].strip().split(" ")[0].lower() if query.strip() else ""
+        if word and word not in words:
+            words.append(word)
+    defined = {query.split(":")[0].strip().lower() for query in queries if ":" in query}
+    return [word for word in words
+            if word in defined or not any(other != word and other.startswith(word) for other in words)]
+
+
+def build_trees(root, args):
+    trees = {
+        "flat": make_flat_tree(os.path.join(root, "flat"), args.flat_files, args.flat_files // 10),
+        "deep": make_deep_tree(os.path.join(root, "deep"), args.depth),
+        "unicode": make_unicode_tree(os.path.join(root, "unicode"), args.unicode_files, 20),
+    }
+    loop_root = os.path.join(root, "loop")
+    if make_symlink_loop(loop_root):
+        trees["loop"] = loop_root
+    return trees
+
+
+def replay_in_process(queries, settings_file, trace_memory=False):
+    os.environ["FOLDERLIST_SETTINGS"] = settings_file
+    from main import FolderListPlugin
+
+    global _counting
+    if trace_memory:
+        tracemalloc.start()
+    _fs_events.clear()
+    _counting = True
+    plugin = FolderListPlugin(dispatch=False)
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        plugin.handle_request({"method": "query", "parameters": [query]})
+        samples.append(time.perf_counter() - start)
+    _counting = False
+    peak = 0
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return samples, dict(_fs_events), peak
+
+
+def replay_one_shot(queries, env, strace_dir=None):
+    samples = []
+    syscalls = []
+    for n, query in enumerate(queries):
+        command = [sys.executable, MAIN_PY, json.dumps({"method": "query", "parameters": [query]})]
+        if strace_dir:
+            summary_file = os.path.join(strace_dir, f"strace-{n}.txt")
+            command = ["strace", "-f", "-c", "-o", summary_file] + command
+        start = time.perf_counter()
+        subprocess.run(command, env=env, stdout=subprocess.DEVNULL, check=True)
+        samples.append(time.perf_counter() - start)
+        if strace_dir:
+            syscalls.append(strace_total(summary_file))
+    return samples, syscalls
+
+
+def strace_total(summary_file):
+    """Total syscall count from an ``strace -c`` summary."""
+    with open(summary_file, "r", encoding="utf-8") as f:
+        for line in f:
+            fields = line.split()
+            if fields and fields[-1] == "total":
+                return int(fields[3])
+    return 0
+
+
+def children_max_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # KiB on Linux
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--trace", default=os.path.join(PLUGIN_DIR, "folder_list_plugin.log"))
+    parser.add_argument("--flat-files", type=int, default=100_000)
+    parser.add_argument("--depth", type=int, default=40)
+    parser.add_argument("--unicode-files", type=int, default=2000)
+    parser.add_argument("--oneshot", type=int, default=60)
+    parser.add_argument("--strace", action="store_true")
+    args = parser.parse_args()
+
+    recorded = load_trace(args.trace)
+    # Queries containing ':' would add keywords or run commands; keep the replay read-only
+    queries = [query for query in recorded if ":" not in query]
+    keywords = trace_keywords(recorded)
+    if not queries:
+        sys.exit(f"No 'Received query' lines in {args.trace}")
+    print(f"{len(queries)} queries ({len(recorded) - len(queries)} with ':' skipped), "
+          f"keywords: {', '.join(keywords)}")
+
+    sys.addaudithook(_audit)
+    with temp_dir() as root:
+        start = time.perf_counter()
+        trees = build_trees(root, args)
+        print(f"built trees {', '.join(trees)} in {time.perf_counter() - start:.1f}s")
+        tree_paths = list(trees.values())
+        mapping = {word: tree_paths[i % len(tree_paths)] for i, word in enumerate(keywords)}
+        mapping.update(trees)  # the tree names work as keywords too
+        settings_file = write_settings(os.path.join(root, "settings.json"), mapping)
+
+        samples, events, _ = replay_in_process(queries, settings_file)
+        print(summarize("in-process", samples))
+        print(f"{'':<28} fs operations: "
+              + ", ".join(f"{name}={events.get(name, 0)}" for name in FS_EVENTS))
+        _, _, peak = replay_in_process(queries, settings_file, trace_memory=True)
+        print(f"{'':<28} peak traced memory {peak / 2**20:.1f}MiB")
+
+        one_shot = queries[:args.oneshot]
+        if one_shot:
+            env = plugin_env(settings_file)
+            samples, _ = replay_one_shot(one_shot, env)
+            print(summarize("one-shot main.py", samples))
+            rss = children_max_rss_kb()
+            if rss is not None:
+                print(f"{'':<28} max RSS {rss / 1024:.1f}MiB")
+            if args.strace:
+                if shutil.which("strace") is None:
+                    print("strace not found, skipping syscall counts")
+                else:
+                    _, syscalls = replay_one_shot(one_shot, env, strace_dir=root)
+                    print(f"{'':<28} syscalls per query: "
+                          f"mean {sum(syscalls) / len(syscalls):.0f}, max {max(syscalls)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""Support modules for the Folder List Flow Launcher plugin."""
+
+# Methods whose return value is a result list sent back to Flow Launcher
+RESULT_METHODS = frozenset(("query", "context_menu"))
+
+
+class UnknownMethod(Exception):
+    """A JSON-RPC request named a method the plugin does not expose."""
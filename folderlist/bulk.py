@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk keyword import and export.
+
+Keywords can be imported from
+
+- a ``.json`` file: ``{"keyword": "path", ...}`` or a settings file with a
+  ``"keywords"`` object,
+- a ``.csv`` file: ``keyword,path`` rows (an optional ``keyword,path``
+  header is skipped),
+- any other text file: ``keyword=path`` lines (blank lines and lines
+  starting with ``#`` are ignored),
+- a folder: every subfolder is registered under its lowercased name.
+
+All candidate paths are checked concurrently (they may live on slow
+network shares) and the accepted keywords are committed by the caller with
+a single settings write.
+"""
+
+import csv
+import json
+import os
+from typing import Dict, List, NamedTuple, Tuple
+
+from folderlist.keywords import KeywordIndex, canonical_path
+from folderlist.listing import scan_dir
+
+# Paths checked at the same time when validating an import
+VALIDATION_WORKERS = 16
+
+
+class ImportPlan(NamedTuple):
+    accepted: List[Tuple[str, str]]
+    skipped: List[Tuple[str, str, str]]  # (keyword, path, reason)
+
+
+def _format(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".json", ".csv"):
+        return extension[1:]
+    return "lines"
+
+
+def read_source(source: str) -> List[Tuple[str, str]]:
+    """Read ``(keyword, path)`` pairs from a keyword file or a parent folder."""
+    if os.path.isdir(source):
+        return [
+            ("-".join(entry.name.lower().split()), entry.path)
+            for entry in scan_dir(source) if entry.is_dir
+        ]
+
+    file_format = _format(source)
+    with open(source, "r", encoding="utf-8-sig", newline="") as f:
+        if file_format == "json":
+            data = json.load(f)
+            if isinstance(data, dict) and isinstance(data.get("keywords"), dict):
+                data = data["keywords"]
+            if not isinstance(data, dict):
+                raise ValueError("JSON import must be an object of keyword: path")
+            return [(str(k), str(v)) for k, v in data.items()]
+
+        if file_format == "csv":
+            pairs = []
+            for row in csv.reader(f):
+                if len(row) < 2 or not row[0].strip():
+                    continue
+                if not pairs and row[0].strip().lower() == "keyword":
+                    continue
+                pairs.append((row[0], row[1]))
+            return pairs
+
+        pairs = []
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            keyword, _, path = line.partition("=")
+            pairs.append((keyword, path))
+        return pairs
+
+
+def plan_import(pairs: List[Tuple[str, str]], keywords: Dict[str, str],
+                index: KeywordIndex) -> ImportPlan:
+    """Decide which pairs can be added, checking every path concurrently."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    pairs = [(keyword.strip().lower(), path.strip().strip('"\'')) for keyword, path in pairs]
+    with ThreadPoolExecutor(max_workers=VALIDATION_WORKERS) as pool:
+        exists = list(pool.map(lambda pair: os.path.exists(pair[1]), pairs))
+
+    accepted = []
+    skipped = []
+    batch_keywords = set()
+    batch_paths = set()
+    for (keyword, path), path_exists in zip(pairs, exists):
+        canonical = canonical_path(path) if path else ""
+        if not keyword or not path:
+            reason = "Missing keyword or path"
+        elif not path_exists:
+            reason = f"Path does not exist: {path}"
+        elif keyword in keywords or keyword in batch_keywords:
+            reason = f"Keyword '{keyword}' already exists"
+        elif index.keyword_for_path(path) is not None:
+            reason = f"Path already exists with keyword '{index.keyword_for_path(path)}'"
+        elif canonical in batch_paths:
+            reason = "Path listed twice in this import"
+        else:
+            accepted.append((keyword, path))
+            batch_keywords.add(keyword)
+            batch_paths.add(canonical)
+            continue
+        skipped.append((keyword, path, reason))
+    return ImportPlan(accepted, skipped)
+
+
+def write_export(target: str, keywords: Dict[str, str]) -> str:
+    """Write keywords to ``target`` in the format its extension implies; returns the format."""
+    file_format = _format(target)
+    with open(target, "w", encoding="utf-8", newline="") as f:
+        if file_format == "json":
+            json.dump(keywords, f, indent=4, ensure_ascii=False)
+        elif file_format == "csv":
+            writer = csv.writer(f)
+            writer.writerow(["keyword", "path"])
+            writer.writerows(keywords.items())
+        else:
+            f.writelines(f"{keyword}={path}\n" for keyword, path in keywords.items())
+    return file_format
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+Directory listing cache.
+
+Listings are keyed by normalized path and validated against the directory's
+``(st_mtime_ns, st_ino)`` before use: adding, removing or renaming a child
+bumps the directory mtime, so a matching signature means the cached listing
+is still current and one ``stat`` replaces a full re-enumeration.
+
+The in-memory cache is an LRU bounded by the total number of entries held
+across all listings. When a cache directory is given, listings are also
+written there (one marshal file per directory) so one-shot processes can
+reuse what earlier keystrokes enumerated.
+
+With a ``Watcher`` attached (server mode), a folder is watched before it is
+stat'ed or read, so its listing is known current from then on: while the
+watch lasts, lookups return it without any ``stat``, and ``sync`` patches it
+with the added, removed and modified names the watcher reports. A patched
+listing is a new list, so indexes memoized for the old one are not reused.
+
+A cache may be shared with the threads of a ``ListingPool``: its state is
+guarded by a lock that is released while a folder is stat'ed or read, so a
+slow folder never holds up lookups of the others.
+"""
+
+import logging
+import marshal
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from folderlist.listing import Entry, iter_entries, scan_dir
+from folderlist.storage import RACY_WINDOW_NS, atomic_write
+
+# Bumped whenever the on-disk row layout (the Entry fields) changes
+DISK_FORMAT = 2
+
+COUNTERS_FILE = "counters"
+COUNTER_NAMES = ("hits", "misses", "refreshes", "evictions", "patches")
+
+
+def cache_key(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+class ListingCache:
+    def __init__(self, max_entries: int = 200_000, cache_dir: Optional[str] = None,
+                 max_disk_listings: int = 64):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_listings = max_disk_listings
+        self._listings: "OrderedDict[str, Tuple[tuple, List[Entry]]]" = OrderedDict()
+        self._total_entries = 0
+        self._dirty_counters = False
+        self.counters = dict.fromkeys(COUNTER_NAMES, 0)
+        self.watcher = None  # a folderlist.watcher.Watcher in server mode
+        # Keys of listings kept current by the watcher
+        self._live = set()
+        self._lock = threading.RLock()
+        if cache_dir:
+            self._load_counters()
+
+    def watch(self, path: str) -> bool:
+        """Subscribe to changes of ``path`` ahead of its first listing."""
+        with self._lock:
+            return self.watcher is not None and self.watcher.watch(cache_key(path), path)
+
+    def get(self, path: str) -> List[Entry]:
+        """Return the listing of ``path``, re-enumerating only if it changed."""
+        key, signature, cached = self._lookup(path)
+        if cached is not None:
+            return cached
+
+        entries = scan_dir(path)
+        self._remember(key, signature, entries)
+        return entries
+
+    def stream(self, path: str) -> Iterable[Entry]:
+        """
+        Return the listing of ``path`` for callers that may stop early.
+
+        A valid cached listing is returned as is (a list). Otherwise a
+        generator enumerates the directory lazily and only caches the
+        listing if the caller reads it to the end.
+        """
+        key, signature, cached = self._lookup(path)
+        if cached is not None:
+            return cached
+        return self._stream(key, signature, path)
+
+    def _stream(self, key: str, signature: tuple, path: str) -> Iterator[Entry]:
+        entries = []
+        for entry in iter_entries(path):
+            entries.append(entry)
+            yield entry
+        self._remember(key, signature, entries)
+
+    def _lookup(self, path: str):
+        """Return ``(key, signature, entries)``; entries is None unless the cache is valid."""
+        key = cache_key(path)
+        with self._lock:
+            if key in self._live:
+                cached = self._listings.get(key)
+                if cached is not None:
+                    self._listings.move_to_end(key)
+                    # Keeps the watch of a folder in use from being the next one dropped
+                    self.watcher.watch(key, path)
+                    self._count("hits")
+                    return key, cached[0], cached[1]
+                self._live.discard(key)
+            # Watch before the stat: whatever changes after it is reported
+            watching = self.watcher is not None and self.watcher.watch(key, path)
+        st = os.stat(path)
+        signature = (st.st_mtime_ns, st.st_ino)
+
+        with self._lock:
+            cached = self._listings.get(key)
+            if cached is None and self.cache_dir:
+                cached = self._read_disk(key)
+                if cached is not None:
+                    self._store(key, *cached)
+
+            if cached is not None and cached[0] == signature:
+                self._listings.move_to_end(key)
+                self._count("hits")
+                if watching:
+                    self._live.add(key)
+                return key, signature, cached[1]
+
+            self._count("refreshes" if cached is not None else "misses")
+        if time.time_ns() - st.st_mtime_ns < RACY_WINDOW_NS:
+            # Never matches a real signature, so the next lookup re-enumerates
+            signature = (None, st.st_ino)
+        return key, signature, None
+
+    def _remember(self, key: str, signature: tuple, entries: List[Entry]) -> None:
+        with self._lock:
+            self._store(key, signature, entries)
+            if self.watcher is not None and self.watcher.is_watching(key) and key in self._listings:
+                self._live.add(key)
+            if self.cache_dir:
+                self._write_disk(key, signature, entries)
+
+    def _invalidate(self, key: str) -> None:
+        self._live.discard(key)
+        cached = self._listings.pop(key, None)
+        if cached is not None:
+            self._total_entries -= len(cached[1])
+
+    def sync(self) -> List[str]:
+        """
+        Apply the changes the watcher reported since the last call; returns
+        the paths of the folders that changed.
+        """
+        if self.watcher is None:
+            return []
+        with self._lock:
+            return self._sync()
+
+    def _sync(self) -> List[str]:
+        from folderlist.watcher import OVERFLOW, RESCAN, UNWATCHED
+
+        changed = []
+        patches: Dict[str, list] = {}
+        for change in self.watcher.changes():
+            if change.kind == OVERFLOW:
+                # Events were lost: fall back to stat'ing every listing
+                self._live.clear()
+                patches.clear()
+            elif change.kind == UNWATCHED:
+                self._live.discard(change.key)
+                patches.pop(change.key, None)
+            else:
+                changed.append(change.folder)
+                if change.kind == RESCAN:
+                    self._invalidate(change.key)
+                    patches.pop(change.key, None)
+                elif change.key in self._live:
+                    patches.setdefault(change.key, []).append(change)
+        for key, changes in patches.items():
+            # Patching one listing can evict another that is still queued
+            if key in self._listings:
+                self._patch(key, changes)
+            else:
+                self._live.discard(key)
+        return changed
+
+    def _patch(self, key: str, changes: list) -> None:
+        from folderlist.watcher import ADDED, MODIFIED, REMOVED
+
+        # The signature is left as it was: should the watch be dropped, the
+        # folder's newer mtime makes the next lookup re-read it
+        signature, entries = self._listings[key]
+        by_name = {entry.name: entry for entry in entries}
+        for change in changes:
+            name = change.name
+            if change.kind == REMOVED:
+                by_name.pop(name, None)
+            elif change.kind == ADDED or (change.kind == MODIFIED and name in by_name):
+                # A fresh record: a modified entry's size and mtime are read again
+                by_name[name] = Entry(name, change.folder, change.is_dir, name.casefold())
+        self._store(key, signature, list(by_name.values()))
+        self._count("patches")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counters, listings=len(self._listings), entries=self._total_entries,
+                        live=len(self._live))
+
+    def flush(self) -> None:
+        """Persist the counters if they changed (only when a cache directory is set)."""
+        if not self.cache_dir or not self._dirty_counters:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with self._lock:
+                atomic_write(os.path.join(self.cache_dir, COUNTERS_FILE),
+                             marshal.dumps(self.counters), fsync=False)
+                self._dirty_counters = False
+        except OSError as e:
+            logging.warning("Could not save listing cache counters: %s", e)
+
+    def _count(self, name: str) -> None:
+        self.counters[name] += 1
+        self._dirty_counters = True
+
+    def _store(self, key: str, signature: tuple, entries: List[Entry]) -> None:
+        previous = self._listings.pop(key, None)
+        if previous is not None:
+            self._total_entries -= len(previous[1])
+        if len(entries) > self.max_entries:
+            self._live.discard(key)
+            return
+        self._listings[key] = (signature, entries)
+        self._total_entries += len(entries)
+        while self._total_entries > self.max_entries:
+            evicted_key, (_, evicted) = self._listings.popitem(last=False)
+            self._live.discard(evicted_key)
+            self._total_entries -= len(evicted)
+            self._count("evictions")
+
+    # On-disk listings
+
+    def _disk_path(self, key: str) -> str:
+        import hashlib
+        digest = hashlib.sha1(key.encode("utf-8", "surrogatepass")).hexdigest()
+        return os.path.join(self.cache_dir, digest + ".listing")
+
+    def _read_disk(self, key: str):
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                disk_format, stored_key, signature, rows = marshal.loads(f.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if disk_format != DISK_FORMAT or stored_key != key:
+            return None
+        return tuple(signature), [Entry(*row) for row in rows]
+
+    def _write_disk(self, key: str, signature: tuple, entries: List[Entry]) -> None:
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            rows = [entry.to_row() for entry in entries]
+            atomic_write(self._disk_path(key),
+                         marshal.dumps((DISK_FORMAT, key, signature, rows)), fsync=False)
+            self._prune_disk()
+        except (OSError, ValueError) as e:
+            logging.warning("Could not write listing cache for %s: %s", key, e)
+
+    def _prune_disk(self) -> None:
+        with os.scandir(self.cache_dir) as it:
+            files = [item for item in it if item.name.endswith(".listing")]
+        excess = len(files) - self.max_disk_listings
+        if excess <= 0:
+            return
+        files.sort(key=lambda item: item.stat().st_mtime_ns)
+        for item in files[:excess]:
+            try:
+                os.remove(item.path)
+                self._count("evictions")
+            except OSError:
+                pass
+
+    def _load_counters(self) -> None:
+        try:
+            with open(os.path.join(self.cache_dir, COUNTERS_FILE), "rb") as f:
+                stored = marshal.loads(f.read())
+            for name in COUNTER_NAMES:
+                self.counters[name] = int(stored.get(name, 0))
+        except (OSError, EOFError, ValueError, TypeError, AttributeError):
+            pass
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Concurrent listing of the folders of several matched keywords.
+
+A query like ``cat`` can match ``cat`` and ``catvids`` at once. Listing
+their folders one after another makes the query as slow as all of them
+together, and a folder on an unplugged drive or a sleeping network share
+holds up every folder behind it. A ``ListingPool`` hands the folders to a
+few daemon threads, so the query takes as long as the slowest folder, and
+can give up waiting on a folder once ``time_budget`` has passed: the
+caller shows that folder as still loading, while the worker goes on and
+leaves its listing in the cache for the next keystroke. A long-lived
+process keeps it in memory; a one-shot process sends its response first
+and then waits a while longer (``wait``) for the folder to land in the
+persistent cache, where the next keystroke's process finds it.
+
+A folder that is still being listed for an earlier query is not queued
+again; the new query waits on the same job, so a hung drive ties up at most
+one worker.
+"""
+
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+from folderlist.cache import ListingCache, cache_key
+from folderlist.listing import Entry
+
+
+class ListingJob:
+    """The listing of one folder, filled in by a pool worker."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Optional[List[Entry]] = None
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+    def result(self) -> List[Entry]:
+        """The listing; raises what listing the folder raised. Only valid once ``done``."""
+        if self.error is not None:
+            raise self.error
+        return self.entries
+
+
+class ListingPool:
+    def __init__(self, cache: ListingCache, workers: int = 4):
+        self.cache = cache
+        self.workers = max(1, workers)
+        self._jobs: "queue.SimpleQueue[ListingJob]" = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        # Jobs queued or running, by cache key
+        self._in_flight: Dict[str, ListingJob] = {}
+        self._threads: List[threading.Thread] = []
+
+    def list_all(self, paths: List[str], time_budget: Optional[float] = None) -> List[ListingJob]:
+        """
+        List ``paths`` concurrently and return their jobs in the same order,
+        once all are done or ``time_budget`` seconds (if given) have passed.
+        """
+        jobs = [self._submit(path) for path in paths]
+        deadline = None if time_budget is None else time.monotonic() + time_budget
+        for job in jobs:
+            if not job.done.wait(None if deadline is None else max(0.0, deadline - time.monotonic())):
+                break  # out of time; the remaining jobs are reported as they are
+        return jobs
+
+    def busy(self) -> bool:
+        """Whether any folder is still queued or being listed."""
+        with self._lock:
+            return bool(self._in_flight)
+
+    def wait(self, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for every queued folder; False if some are still running."""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            jobs = list(self._in_flight.values())
+        return all(job.done.wait(max(0.0, deadline - time.monotonic())) for job in jobs)
+
+    def _submit(self, path: str) -> ListingJob:
+        key = cache_key(path)
+        with self._lock:
+            job = self._in_flight.get(key)
+            if job is not None:
+                return job
+            job = self._in_flight[key] = ListingJob(path)
+            # Workers are started on demand: one-shot queries rarely need them all
+            if len(self._threads) < min(self.workers, len(self._in_flight)):
+                thread = threading.Thread(target=self._work, name=f"folderlist-list-{len(self._threads)}",
+                                          daemon=True)
+                self._threads.append(thread)
+                thread.start()
+        self._jobs.put(job)
+        return job
+
+    def _work(self) -> None:
+        while True:
+            job = self._jobs.get()
+            try:
+                job.entries = self.cache.get(job.path)
+            except Exception as e:
+                job.error = e
+            finally:
+                with self._lock:
+                    self._in_flight.pop(cache_key(job.path), None)
+                job.done.set()
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Filtering of directory entries by the text typed after a keyword.
+
+``catvids kitten`` lists only the entries of the ``catvids`` folder whose
+name matches ``kitten``. The filter text selects a mode with an optional
+leading marker, otherwise the configured default applies:
+
+    kitten      default mode (``filter_mode`` setting, "substring" if unset)
+    ^kitten     prefix: the name starts with the text
+    ~ktn        fuzzy: the characters appear in order in the name
+
+The mode decides which entries match; every match is then scored by
+``folderlist.fuzzy`` so exact names, prefixes and word-boundary hits rank
+first. Cached listings are matched through a ``FuzzyIndex``; uncached ones
+are streamed, and enumeration stops once enough prefix matches were found
+so a huge directory does not have to be read to the end.
+"""
+
+from collections import OrderedDict
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from folderlist import fuzzy
+from folderlist.fuzzy import FuzzyIndex
+from folderlist.listing import Entry
+
+FILTER_MODES = ("substring", "prefix", "fuzzy")
+MODE_MARKERS = {"^": "prefix", "~": "fuzzy"}
+
+# Listings whose FuzzyIndex is kept around, keyed by id() of the listing
+INDEX_MEMO_SIZE = 8
+
+
+class EntryFilter(NamedTuple):
+    mode: str
+    needle: str  # casefolded filter text
+
+
+def parse_filter(text: str, default_mode: str = "substring") -> Optional[EntryFilter]:
+    """Parse the text after a keyword; returns None when there is nothing to filter by."""
+    text = text.strip()
+    mode = default_mode if default_mode in FILTER_MODES else "substring"
+    if text[:1] in MODE_MARKERS:
+        mode = MODE_MARKERS[text[0]]
+        text = text[1:].lstrip()
+    if not text:
+        return None
+    return EntryFilter(mode, text.casefold())
+
+
+_index_memo: "OrderedDict[int, Tuple[list, FuzzyIndex]]" = OrderedDict()
+
+
+def index_for(entries: List[Entry]) -> FuzzyIndex:
+    """Return the FuzzyIndex for a cached listing, building it on first use."""
+    memo = _index_memo.get(id(entries))
+    # The memo holds a reference to the listing, so its id cannot be reused
+    if memo is not None and memo[0] is entries:
+        _index_memo.move_to_end(id(entries))
+        return memo[1]
+    index = FuzzyIndex([entry.name for entry in entries], [entry.sort_key for entry in entries])
+    _index_memo[id(entries)] = (entries, index)
+    while len(_index_memo) > INDEX_MEMO_SIZE:
+        _index_memo.popitem(last=False)
+    return index
+
+
+def key_matches(entry_filter: EntryFilter, key: str) -> bool:
+    """Whether the casefolded name ``key`` matches the filter in its mode."""
+    needle = entry_filter.needle
+    if entry_filter.mode == "prefix":
+        return key.startswith(needle)
+    if entry_filter.mode == "substring":
+        return needle in key
+    return fuzzy.is_match(needle, key)
+
+
+def filter_entries(entries: Iterable[Entry], entry_filter: EntryFilter, enough: int,
+                   read_all: bool = False) -> Tuple[List[Tuple[Entry, int]], int, bool]:
+    """
+    Collect ``(entry, score)`` matches from ``entries``, in listing order.
+
+    Also returns how many leading matches it takes to reach ``enough``
+    prefix matches: the first page is ranked from those alone, so a stream
+    is abandoned there unless ``read_all`` is set, and the last return
+    value is False when that happened, i.e. when the input was not read to
+    the end. A list is treated as a complete cached listing and matched
+    through its FuzzyIndex.
+    """
+    needle = entry_filter.needle
+    if isinstance(entries, list):
+        index = index_for(entries)
+        matches = [(entries[i], score) for i, score in sorted(index.search(needle, entry_filter.mode))]
+        head = len(matches)
+        strong = 0
+        for position, (entry, _) in enumerate(matches):
+            if entry.sort_key.startswith(needle):
+                strong += 1
+                if strong >= enough:
+                    head = position + 1
+                    break
+        return matches, head, True
+
+    matches = []
+    head = None
+    strong = 0
+    iterator = iter(entries)
+    for entry in iterator:
+        if not key_matches(entry_filter, entry.sort_key):
+            continue
+        matches.append((entry, fuzzy.score(needle, entry.name) or 0))
+        if head is None and entry.sort_key.startswith(needle):
+            strong += 1
+            if strong >= enough:
+                head = len(matches)
+                if not read_all:
+                    close = getattr(iterator, "close", None)
+                    if close is not None:
+                        close()
+                    return matches, head, False
+    return matches, len(matches) if head is None else head, True
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+Fuzzy matching and scoring.
+
+A query matches a candidate when its characters appear in the candidate in
+order (case-insensitively). Matches are scored from the positions the
+characters land on:
+
+- every matched character earns a base score,
+- characters on a word boundary (start of the name, after a separator such
+  as ``-``/``_``/``.``/space, a camelCase hump or the first digit of a
+  number) earn a bonus, so acronyms like ``tlf`` rank
+  ``throne-lang-frontend`` highly,
+- consecutive characters earn a bonus, gaps cost a penalty that grows with
+  their length, and unmatched characters before the first match cost a
+  little,
+- an exact (whole name) match earns a large bonus.
+
+``FuzzyIndex`` precomputes the casefolded candidates joined into a single
+``\\0``-separated haystack, so finding which of 100k candidates match a
+prefix, substring or fuzzy query is one regex scan rather than a Python
+loop, and a substring that occurs nowhere is rejected with a single ``in``
+test; only the candidates that pass are scored. Substring matches (the
+common case) are scored in constant time from where the run starts.
+"""
+
+import re
+from itertools import accumulate
+from typing import Dict, List, Optional, Sequence, Tuple
+
+SCORE_MATCH = 16
+BONUS_BOUNDARY = 10
+BONUS_START = 15
+BONUS_CONSECUTIVE = 6
+BONUS_EXACT = 50
+PENALTY_GAP_START = 3
+PENALTY_GAP_EXTENSION = 1
+MAX_GAP_EXTENSION = 8
+MAX_LEADING_PENALTY = 5
+
+SEPARATORS = frozenset(" _-./\\()[]{}+,;@#&'~")
+
+# How many occurrences of a substring to inspect when looking for one that
+# starts on a word boundary
+MAX_SUBSTRING_PROBES = 8
+
+
+def is_boundary(name: str, pos: int) -> bool:
+    """True if ``name[pos]`` starts a word."""
+    if pos == 0:
+        return True
+    prev = name[pos - 1]
+    char = name[pos]
+    return char not in SEPARATORS and (
+        prev in SEPARATORS
+        or (prev.islower() and char.isupper())
+        or (char.isdigit() and not prev.isdigit())
+    )
+
+
+def _position_bonus(name: str, pos: int) -> int:
+    if pos == 0:
+        return BONUS_START
+    return BONUS_BOUNDARY if is_boundary(name, pos) else 0
+
+
+def _score_positions(positions: Sequence[int], key: str, name: str) -> int:
+    score = 0
+    prev = -1
+    for n, pos in enumerate(positions):
+        score += SCORE_MATCH + _position_bonus(name, pos)
+        if n:
+            if pos == prev + 1:
+                score += BONUS_CONSECUTIVE
+            else:
+                extension = min(pos - prev - 2, MAX_GAP_EXTENSION)
+                score -= PENALTY_GAP_START + extension * PENALTY_GAP_EXTENSION
+        prev = pos
+    score -= min(positions[0], MAX_LEADING_PENALTY)
+    if len(positions) == len(key):
+        score += BONUS_EXACT
+    return score
+
+
+def _contiguous_score(length: int, pos: int, key: str, name: str) -> int:
+    """Score of a substring match; word boundaries inside the run are not counted."""
+    score = length * SCORE_MATCH + (length - 1) * BONUS_CONSECUTIVE
+    score += _position_bonus(name, pos) - min(pos, MAX_LEADING_PENALTY)
+    if length == len(key):
+        score += BONUS_EXACT
+    return score
+
+
+def is_match(query: str, key: str) -> bool:
+    """True if the characters of ``query`` appear in order in ``key``."""
+    pos = 0
+    for char in query:
+        pos = key.find(char, pos) + 1
+        if not pos:
+            return False
+    return True
+
+
+def _tight_alignment(query: str, key: str) -> Optional[List[int]]:
+    """Leftmost match, then pulled right-to-left into the shortest window."""
+    pos = 0
+    for char in query:
+        pos = key.find(char, pos) + 1
+        if not pos:
+            return None
+    positions = [0] * len(query)
+    pos = pos - 1
+    for n in range(len(query) - 1, -1, -1):
+        pos = key.rfind(query[n], 0, pos + 1)
+        positions[n] = pos
+        pos -= 1
+    return positions
+
+
+def _boundary_alignment(query: str, key: str, name: str) -> Optional[List[int]]:
+    """Match each character on the next word boundary if one has it."""
+    positions = []
+    pos = 0
+    for char in query:
+        first = found = key.find(char, pos)
+        while found >= 0 and not is_boundary(name, found):
+            found = key.find(char, found + 1)
+        pos = found if found >= 0 else first
+        if pos < 0:
+            return None
+        positions.append(pos)
+        pos += 1
+    return positions
+
+
+def _substring_score(query: str, key: str, name: str) -> Optional[int]:
+    start = key.find(query)
+    if start < 0:
+        return None
+    best = start
+    probes = 0
+    while start >= 0 and probes < MAX_SUBSTRING_PROBES:
+        if is_boundary(name, start):
+            best = start
+            break
+        start = key.find(query, start + 1)
+        probes += 1
+    return _contiguous_score(len(query), best, key, name)
+
+
+def score_key(query: str, key: str, name: Optional[str] = None) -> Optional[int]:
+    """
+    Score a casefolded ``query`` against a casefolded ``key``.
+
+    ``name`` is the original spelling, used to find camelCase humps; it is
+    ignored when casefolding changed the length (e.g. 'ß' -> 'ss').
+    """
+    if name is None or len(name) != len(key):
+        name = key
+    if not query:
+        return 0
+    substring = _substring_score(query, key, name)
+    if substring is not None:
+        return substring
+    tight = _tight_alignment(query, key)
+    if tight is None:
+        return None
+    best = _score_positions(tight, key, name)
+    aligned = _boundary_alignment(query, key, name)
+    if aligned is not None:
+        best = max(best, _score_positions(aligned, key, name))
+    return best
+
+
+def score(query: str, name: str) -> Optional[int]:
+    """Score ``query`` against a single ``name``; None if it does not match."""
+    return score_key(query.casefold(), name.casefold(), name)
+
+
+def _fuzzy_pattern(query: str) -> str:
+    # [^\0t]*t[^\0l]*l... finds the leftmost position of every character
+    # without backtracking, and never crosses into the next candidate
+    return "".join(f"[^\0{re.escape(char)}]*{re.escape(char)}" for char in query)
+
+
+class FuzzyIndex:
+    """Precomputed match data for a fixed list of candidate names."""
+
+    def __init__(self, names: Sequence[str], keys: Optional[Sequence[str]] = None):
+        self.names = names
+        self.keys = keys if keys is not None else [name.casefold() for name in names]
+        self._haystack = "\0" + "\0".join(self.keys) + "\0"
+        self._positions: Optional[Dict[str, object]] = None
+        self._ends: Optional[Dict[int, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _indices(self, found_keys: List[str]) -> List[int]:
+        """Map keys found in the haystack back to candidate indices."""
+        positions = self._positions
+        if positions is None:
+            positions = dict(zip(self.keys, range(len(self.keys))))
+            if len(positions) != len(self.keys):
+                # Several names casefold to the same key (e.g. 'A' and 'a')
+                grouped: Dict[str, List[int]] = {}
+                for i, key in enumerate(self.keys):
+                    grouped.setdefault(key, []).append(i)
+                positions = {key: same[0] if len(same) == 1 else same for key, same in grouped.items()}
+            self._positions = positions
+        indices = []
+        for key in dict.fromkeys(found_keys):
+            index = positions[key]
+            if isinstance(index, list):
+                indices.extend(index)
+            else:
+                indices.append(index)
+        return indices
+
+    def _key_ends(self) -> Dict[int, int]:
+        """Map the haystack offset of the ``\\0`` closing each key to the candidate index."""
+        if self._ends is None:
+            # The first key starts at 1, after the leading \0
+            self._ends = dict(zip(accumulate(len(key) + 1 for key in self.keys), range(len(self.keys))))
+        return self._ends
+
+    def prefix_matches(self, needle: str) -> List[int]:
+        found = re.findall("\0(" + re.escape(needle) + "[^\0]*)", self._haystack)
+        return self._indices(found)
+
+    def substring_matches(self, needle: str) -> List[int]:
+        if needle not in self._haystack:
+            return []
+        # Each match runs on to the end of its key, so a key is found once however
+        # often it contains the needle, and where the match ends names the key
+        ends = self._key_ends()
+        return [ends[match.end()] for match in re.finditer(re.escape(needle) + "[^\0]*", self._haystack)]
+
+    def fuzzy_matches(self, query: str) -> List[int]:
+        if len(query) == 1:
+            return self.substring_matches(query)
+        haystack = self._haystack
+        if any(char not in haystack for char in set(query)):
+            return []
+        found = re.findall("\0(" + _fuzzy_pattern(query) + "[^\0]*)", haystack)
+        return self._indices(found)
+
+    def matches(self, query: str, mode: str = "fuzzy") -> List[int]:
+        if mode == "prefix":
+            return self.prefix_matches(query)
+        if mode == "substring":
+            return self.substring_matches(query)
+        return self.fuzzy_matches(query)
+
+    def score(self, index: int, query: str) -> int:
+        result = score_key(query, self.keys[index], self.names[index])
+        return result if result is not None else 0
+
+    def search(self, query: str, mode: str = "fuzzy") -> List[Tuple[int, int]]:
+        """Return ``(index, score)`` for every candidate matching the casefolded ``query``."""
+        keys = self.keys
+        names = self.names
+        return [(i, score_key(query, keys[i], names[i]) or 0) for i in self.matches(query, mode)]
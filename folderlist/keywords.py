@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Keyword lookup structures.
+
+``KeywordIndex`` keeps the keywords of ``settings["keywords"]`` in a sorted
+list, so the keywords starting with a query are one contiguous slice found
+with two binary searches (O(log n + k)) instead of a scan over every
+keyword. It is built once when settings are loaded and updated in place when
+a keyword is added.
+
+Alongside it, a reverse index maps each keyword's canonical path back to the
+keyword, so checking whether a folder already has a keyword is one dict
+lookup, and ``C:/Videos/Cats`` and ``c:\\videos\\cats\\`` are recognised as
+the same folder.
+"""
+
+import posixpath
+from bisect import bisect_left, insort
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+from folderlist.fuzzy import FuzzyIndex
+
+# Sorts after any character that can appear in a keyword
+_PREFIX_END = "\U0010ffff"
+
+
+def canonical_path(path: str) -> str:
+    """Casefolded, '/'-separated path without a trailing separator."""
+    path = posixpath.normpath(path.strip().replace("\\", "/"))
+    return path.casefold()
+
+
+class KeywordIndex:
+    def __init__(self, keywords: Optional[Mapping[str, str]] = None):
+        keywords = keywords or {}
+        self._sorted: List[str] = sorted(keywords)
+        self._paths: Dict[str, str] = {
+            canonical_path(path): keyword for keyword, path in keywords.items()
+        }
+        self._fuzzy: Optional[FuzzyIndex] = None
+
+    def state(self) -> Tuple[List[str], Dict[str, str]]:
+        """Plain (marshal-friendly) data from which ``from_state`` rebuilds the index."""
+        return self._sorted, self._paths
+
+    @classmethod
+    def from_state(cls, state: Tuple[List[str], Dict[str, str]]) -> "KeywordIndex":
+        index = cls()
+        index._sorted, index._paths = state
+        return index
+
+    def __len__(self) -> int:
+        return len(self._sorted)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._sorted)
+
+    def __contains__(self, keyword: str) -> bool:
+        position = bisect_left(self._sorted, keyword)
+        return position < len(self._sorted) and self._sorted[position] == keyword
+
+    def add(self, keyword: str, path: str) -> None:
+        if keyword not in self:
+            insort(self._sorted, keyword)
+            self._fuzzy = None
+        self._paths[canonical_path(path)] = keyword
+
+    def keyword_for_path(self, path: str) -> Optional[str]:
+        """The keyword registered for ``path`` (in any spelling), if any."""
+        return self._paths.get(canonical_path(path))
+
+    def with_prefix(self, prefix: str) -> List[str]:
+        """Keywords starting with ``prefix``, in sorted order."""
+        low = bisect_left(self._sorted, prefix)
+        high = bisect_left(self._sorted, prefix + _PREFIX_END, low)
+        return self._sorted[low:high]
+
+    def fuzzy_index(self) -> FuzzyIndex:
+        """FuzzyIndex over all keywords, rebuilt only after the keywords change."""
+        if self._fuzzy is None:
+            self._fuzzy = FuzzyIndex(self._sorted)
+        return self._fuzzy
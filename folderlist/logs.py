@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Plugin logging.
+
+The root logger writes to a size-rotated log file, but the file is only
+opened (and ``logging.handlers`` only imported) when the first record at or
+above the configured level is emitted. At the default WARNING level a normal
+query never touches the log file.
+
+With ``use_queue`` records are handed to a background thread through a
+``QueueHandler``, so a slow disk never blocks a query; the thread is drained
+and stopped when logging shuts down at exit.
+"""
+
+import logging
+from typing import Optional
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+DEFAULT_LEVEL = "WARNING"
+DEFAULT_MAX_BYTES = 1024 * 1024
+DEFAULT_BACKUP_COUNT = 2
+
+_handler: Optional["LazyFileHandler"] = None
+
+
+def parse_level(level) -> int:
+    """A logging level from a name such as ``"debug"`` or a number; WARNING if unknown."""
+    if isinstance(level, int):
+        return level
+    value = getattr(logging, str(level).upper(), None)
+    return value if isinstance(value, int) else logging.WARNING
+
+
+class LazyFileHandler(logging.Handler):
+    """Forwards records to a rotating file handler created on first use."""
+
+    def __init__(self, filename: str, max_bytes: int, backup_count: int, use_queue: bool):
+        super().__init__()
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.use_queue = use_queue
+        self._target: Optional[logging.Handler] = None
+        self._file_handler: Optional[logging.Handler] = None
+        self._listener = None
+
+    def _create(self) -> logging.Handler:
+        import logging.handlers
+
+        file_handler = logging.handlers.RotatingFileHandler(
+            self.filename, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding='utf-8'
+        )
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
+        self._file_handler = file_handler
+        if not self.use_queue:
+            return file_handler
+
+        import queue
+        records = queue.SimpleQueue()
+        self._listener = logging.handlers.QueueListener(records, file_handler)
+        self._listener.start()
+        return logging.handlers.QueueHandler(records)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            if self._target is None:
+                self._target = self._create()
+            self._target.handle(record)
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        if self._file_handler is not None and self._listener is None:
+            self._file_handler.flush()
+
+    def close(self) -> None:
+        if self._listener is not None:
+            # Writes out everything still queued, then joins the thread
+            self._listener.stop()
+            self._listener = None
+        if self._file_handler is not None:
+            self._file_handler.close()
+        self._target = self._file_handler = None
+        super().close()
+
+
+def configure(filename: str, level=DEFAULT_LEVEL, max_bytes: int = DEFAULT_MAX_BYTES,
+              backup_count: int = DEFAULT_BACKUP_COUNT, use_queue: bool = False) -> None:
+    """Send the root logger's records to ``filename``, replacing an earlier configuration."""
+    global _handler
+    root = logging.getLogger()
+    if _handler is not None:
+        root.removeHandler(_handler)
+        _handler.close()
+    _handler = LazyFileHandler(filename, max_bytes, backup_count, use_queue)
+    root.addHandler(_handler)
+    root.setLevel(parse_level(level))
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+The listing pipeline shared by keyword queries and path queries.
+
+A page of a folder is produced in stages:
+
+    enumerate   cached listing, or a lazily streamed one when filtering
+    filter      keep and score the entries matching the filter text
+    classify    turn match scores into display scores (folders first)
+    rank        select only the visible page with a top-k heap
+    materialize encode Flow Launcher results, done by the caller
+
+Entries travel through the stages as compact ``(Entry, score)`` tuples;
+only the visible page is ever turned into results, so a 100k-entry folder
+costs one enumeration and a heap selection, not 100k result objects.
+
+A filter over a folder that is not cached yet may stop reading it once the
+first page has enough prefix matches. Every page therefore ranks those
+leading matches on their own, ahead of the rest of the folder's matches,
+and later pages read the whole folder: the first page holds the same
+entries whether it was read in part or in full, and no entry is skipped
+or repeated across pages.
+
+Recursive searches (``keyword ** term``) fuse the first stages: the
+``TreeWalker`` workers filter names as they read them, and ``search_page``
+scores the matches as they arrive and keeps only the best ``end`` in a
+bounded heap, so memory stays flat however large the tree is. With a
+``TreeIndex`` of the tree the matches come from the index instead of the
+disk.
+"""
+
+import heapq
+import os
+from functools import partial
+from itertools import chain, islice
+from time import perf_counter_ns
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from folderlist.cache import ListingCache
+from folderlist import fuzzy
+from folderlist.filtering import EntryFilter, filter_entries, key_matches
+from folderlist.listing import Entry
+from folderlist.ranking import display_score, top_entries, top_matches
+from folderlist.stats import LatencyStats
+
+
+class Page(NamedTuple):
+    rows: List[Tuple[Entry, int]]  # visible (entry, display score), in display order
+    total: int  # entries that matched
+    complete: bool  # False if enumeration stopped early, so total is a lower bound
+
+
+def _unfiltered(entries: List[Entry], end: int) -> Iterator[Tuple[Entry, int]]:
+    for entry in top_entries(entries, end):
+        yield entry, display_score(0, entry.is_dir)
+
+
+def _filtered(matches: List[Tuple[Entry, int]], end: int) -> Iterator[Tuple[Entry, int]]:
+    for entry, match_score in top_matches(matches, end):
+        yield entry, display_score(match_score, entry.is_dir)
+
+
+def list_page(cache: ListingCache, path: str, entry_filter: Optional[EntryFilter],
+              start: int, end: int, latency: LatencyStats) -> Page:
+    """Run ``path`` through the pipeline and return entries ``start:end`` in display order."""
+    if entry_filter is None:
+        started = perf_counter_ns()
+        entries = cache.get(path)
+        latency.lap("enumerate", started)
+        return rank_page(entries, None, start, end, latency)
+    return rank_page(cache.stream(path), entry_filter, start, end, latency)
+
+
+def rank_page(entries: Iterable[Entry], entry_filter: Optional[EntryFilter],
+              start: int, end: int, latency: LatencyStats) -> Page:
+    """
+    Filter and rank an enumerated folder and return entries ``start:end``
+    in display order; ``entries`` must be a list unless filtering.
+    """
+    started = perf_counter_ns()
+    if entry_filter is None:
+        ranked = _unfiltered(entries, end)
+        total, complete = len(entries), True
+    else:
+        matches, head, complete = filter_entries(entries, entry_filter, enough=end - start,
+                                                 read_all=start > 0)
+        started = latency.lap("filter", started)
+        ranked = chain(_filtered(matches[:head], head), _filtered(matches[head:], max(0, end - head)))
+        total = len(matches)
+
+    rows = list(islice(ranked, start, end))
+    latency.lap("sort", started)
+    return Page(rows, total, complete)
+
+
+def search_page(path: str, entry_filter: EntryFilter, start: int, end: int,
+                options: "WalkOptions", latency: LatencyStats, index: Optional["TreeIndex"] = None) -> Page:
+    """Search the whole tree below ``path`` and return matches ``start:end`` in display order."""
+    started = perf_counter_ns()
+    if index is not None:
+        found, stage = index.search(entry_filter), "index"
+    else:
+        # Only '**' searches need the walker, so one-shot keystrokes skip its import
+        from folderlist.walker import TreeWalker
+        found, stage = TreeWalker(path, options, partial(key_matches, entry_filter)), "walk"
+    needle = entry_filter.needle
+    total = 0
+
+    def keyed() -> Iterator[Tuple[tuple, int, Entry]]:
+        nonlocal total
+        for entry in found:
+            total += 1
+            score = display_score(fuzzy.score_key(needle, entry.sort_key, entry.name) or 0, entry.is_dir)
+            # Ties go to the shallower entry, then by name and folder: the
+            # walk's threads find entries in no fixed order, and the index in
+            # another one, but every keystroke must page the same way
+            yield (-score, entry.parent.count(os.sep), entry.sort_key, entry.parent, entry.name), score, entry
+
+    # A bounded heap of the best matches so far, so memory stays flat
+    best = heapq.nsmallest(end, keyed())
+    started = latency.lap(stage, started)
+
+    rows = [(entry, score) for _, score, entry in best[start:]]
+    latency.lap("sort", started)
+    return Page(rows, total, found.complete if index is None else index.complete)
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Ranking of directory entries for display.
+
+Listings show folders before files, each group ordered by casefolded name.
+Only the first page or two is ever displayed, so instead of sorting the whole
+directory ``top_entries`` selects the first ``k`` entries with a heap
+(O(n log k)) over the sort keys precomputed by the listing.
+"""
+
+import heapq
+from operator import attrgetter
+from typing import List, Sequence, Tuple
+
+from folderlist.listing import Entry
+
+_sort_key = attrgetter("sort_key")
+
+# Breaks ties between equally good matches in favour of folders
+FOLDER_BONUS = 10
+
+
+def display_score(match_score: int, is_dir: bool) -> int:
+    """Flow Launcher Score for an entry: match quality first, then folders before files."""
+    return match_score + (FOLDER_BONUS if is_dir else 0)
+
+
+def top_entries(entries: Sequence[Entry], k: int) -> List[Entry]:
+    """Return the first ``k`` entries in display order."""
+    folders = [entry for entry in entries if entry.is_dir]
+    if len(folders) >= k:
+        return heapq.nsmallest(k, folders, key=_sort_key)
+
+    folders.sort(key=_sort_key)
+    files = [entry for entry in entries if not entry.is_dir]
+    return folders + heapq.nsmallest(k - len(folders), files, key=_sort_key)
+
+
+def _match_order(match: Tuple[Entry, int]):
+    entry, match_score = match
+    return -display_score(match_score, entry.is_dir), entry.sort_key
+
+
+def top_matches(matches: Sequence[Tuple[Entry, int]], k: int) -> List[Tuple[Entry, int]]:
+    """Return the ``k`` best ``(entry, score)`` filter matches in display order."""
+    return heapq.nsmallest(k, matches, key=_match_order)
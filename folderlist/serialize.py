@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+JSON-RPC response serialization.
+
+Folder entry results all have the same shape, so instead of building a dict
+(with a nested ``JsonRPCAction`` dict and ``parameters`` list) per entry and
+having the encoder walk it, ``entry_fragment`` assembles the entry's JSON
+text directly from constant fragments plus the escaped name and path. The
+result is a ``Fragment``: a ``str`` holding ready-made JSON that ``dumps``
+splices into the response as is.
+
+Output is compact UTF-8 JSON (non-ASCII names are not ``\\uXXXX``-escaped),
+for writing straight to ``sys.stdout.buffer``. ``use_fast_encoder`` switches
+to ``orjson`` for everything that is not a fragment, if it can be imported
+(e.g. from ``lib/``); importing it costs more than it saves on one
+keystroke's results, so only the long-lived server mode does so.
+
+Names that are not valid Unicode (undecodable bytes on Linux, unpaired
+surrogates on NTFS) reach Python as lone surrogates, which UTF-8 cannot
+encode; those are written as ``\\udcxx`` escapes instead, so such a name
+shows up escaped rather than failing the whole response.
+"""
+
+import codecs
+import json
+from json.encoder import encode_basestring
+from typing import Any
+
+orjson = None
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def _escape_surrogates(error: UnicodeEncodeError):
+    # Lone surrogates only ever occur inside JSON strings, where a \u escape is valid
+    return "".join(f"\\u{ord(char):04x}" for char in error.object[error.start:error.end]), error.end
+
+
+codecs.register_error("folderlist.json_escape", _escape_surrogates)
+
+
+class Fragment(str):
+    """Pre-encoded JSON text, written to the response unchanged."""
+    __slots__ = ()
+
+
+_FOLDER_SUBTITLE = ',"SubTitle":"Folder: '
+_FILE_SUBTITLE = ',"SubTitle":"File: '
+_FOLDER_ACTION = ',"IcoPath":"images/folder.png","JsonRPCAction":{"method":"open_path","parameters":['
+_FILE_ACTION = ',"IcoPath":"images/file.png","JsonRPCAction":{"method":"open_path","parameters":['
+_ACTION_END = '],"dontHideAfterAction":false},"Score":'
+
+
+def entry_fragment(name: str, path: str, is_dir: bool, score: int) -> Fragment:
+    """The result object for a folder entry that opens ``path``."""
+    quoted_path = encode_basestring(path)
+    return Fragment("".join((
+        '{"Title":', encode_basestring(name),
+        _FOLDER_SUBTITLE if is_dir else _FILE_SUBTITLE, quoted_path[1:],
+        _FOLDER_ACTION if is_dir else _FILE_ACTION, quoted_path,
+        _ACTION_END, str(score), "}"
+    )))
+
+
+def use_fast_encoder() -> bool:
+    """Encode with orjson from now on if it is installed; returns whether it is."""
+    global orjson
+    try:
+        import orjson
+    except ImportError:
+        return False
+    return True
+
+
+def _plain(value: Any) -> str:
+    if orjson is not None:
+        try:
+            return orjson.dumps(value).decode("utf-8")
+        except TypeError:
+            # orjson rejects lone surrogates; the json module passes them through
+            pass
+    return _encoder.encode(value)
+
+
+def dumps(value: Any) -> str:
+    """Compact JSON for ``value``, splicing in any Fragment found in its lists."""
+    if isinstance(value, Fragment):
+        return value
+    if isinstance(value, dict):
+        if not any(isinstance(item, (dict, list)) for item in value.values()):
+            return _plain(value)
+        return "{" + ",".join(
+            f"{encode_basestring(str(key))}:{dumps(item)}" for key, item in value.items()
+        ) + "}"
+    if isinstance(value, list):
+        if not any(isinstance(item, (Fragment, dict, list)) for item in value):
+            return _plain(value)
+        return "[" + ",".join([dumps(item) for item in value]) + "]"
+    return _plain(value)
+
+
+def encode(value: Any) -> bytes:
+    """``value`` as one line of UTF-8 JSON, newline included."""
+    return (dumps(value) + "\n").encode("utf-8", "folderlist.json_escape")
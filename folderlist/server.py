@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Long-lived JSON-RPC mode.
+
+Instead of starting one Python process per keystroke, a single
+FolderListPlugin is kept alive; it reads newline-delimited JSON-RPC requests
+from stdin and writes one response line per request to stdout. This is how
+Flow Launcher runs the plugin: ``plugin.json`` declares a ``python_v2``
+plugin, and Flow starts ``main.py`` once with no arguments and talks to it
+over its stdio. ``main.py --server`` starts the same loop for test and
+benchmark harnesses (``bench/replay_server.py``).
+
+Both request shapes are accepted:
+
+    {"method": "query", "parameters": ["cat"]}                  (Flow v1 style)
+    {"jsonrpc": "2.0", "id": 1, "method": "query", "params": ["cat"]}
+
+v1 style requests get the same ``{"result": ..., "debugMessage": ...}``
+payload main.py prints in one-shot mode. JSON-RPC 2.0 requests get that
+payload wrapped in a response object carrying the request id; 2.0
+notifications (no id, e.g. Flow's ``$/cancelRequest``) get no response at
+all.
+
+Flow's v2 calls differ from v1 in a few ways, all bridged here rather than in
+the plugin's methods:
+
+* ``initialize`` is sent once with the plugin context; nothing in it is
+  needed, so it is answered with an empty object.
+* ``query`` gets the whole Query object (and the plugin settings) instead of
+  the search text; the text after the action keyword is passed on, as v1 did.
+* A result action's parameter list arrives as the call's one argument, and
+  the answer tells Flow whether to hide its window.
+* ``Flow.Launcher.*`` actions (``ChangeQuery`` for the next-page row) are
+  Flow API calls, so they are sent back to Flow as notifications.
+
+The server also starts the filesystem watcher, so folders it has listed are
+kept current from change notifications instead of being stat'ed on every
+query.
+"""
+
+import io
+import json
+import logging
+import sys
+from time import perf_counter_ns
+
+from folderlist import RESULT_METHODS, UnknownMethod
+from folderlist.serialize import encode, use_fast_encoder
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INTERNAL_ERROR = -32603
+
+# Action methods Flow Launcher implements itself
+FLOW_API_PREFIX = "Flow.Launcher."
+
+
+def _error(request_id, code, message):
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "error": {"code": code, "message": message}
+    }
+
+
+def _error_rows(message):
+    # v1 callers only understand result lists, so an error is surfaced as one
+    return {
+        "result": [{
+            "Title": "Error",
+            "SubTitle": message,
+            "IcoPath": "images/app.png"
+        }],
+        "debugMessage": ""
+    }
+
+
+def _encode_response(response) -> bytes:
+    """Encode ``response``, or an error in its place if it cannot be encoded."""
+    try:
+        return encode(response)
+    except Exception as e:
+        logging.error("Could not encode response: %s", e)
+        if response.get("jsonrpc") == "2.0":
+            return encode(_error(response.get("id"), INTERNAL_ERROR, f"Could not encode response: {e}"))
+        return encode(_error_rows(f"Could not encode response: {e}"))
+
+
+def _from_flow_v2(method: str, params):
+    """The plugin-side arguments of a v2 call to ``method``."""
+    if not isinstance(params, list):
+        return params  # named parameters, as in $/cancelRequest
+    if method == "query" and params and isinstance(params[0], dict):
+        # (Query, settings): the search text is the query minus its action keyword
+        query = params[0]
+        return [query.get("search", query.get("Search", ""))]
+    if method not in RESULT_METHODS and len(params) == 1 and isinstance(params[0], list):
+        return params[0]
+    return params
+
+
+def _forward_to_flow(request_id, method: str, params: list, notify):
+    """Send a ``Flow.Launcher.*`` action back to Flow as the API call it names."""
+    if notify is None:
+        return _error(request_id, METHOD_NOT_FOUND, f"Unknown method: {method}")
+    notify({"jsonrpc": "2.0", "method": method[len(FLOW_API_PREFIX):], "params": params})
+    return {"jsonrpc": "2.0", "id": request_id, "result": {"Hide": False}}
+
+
+def handle_line(plugin, line: str, notify=None):
+    """
+    Handle one request line and return the response object (or None).
+
+    ``notify`` sends a message to the client unprompted; without it, requests
+    that need one (``Flow.Launcher.*`` actions) are refused.
+    """
+    try:
+        request = json.loads(line)
+    except ValueError as e:
+        return _error(None, PARSE_ERROR, f"Parse error: {e}")
+
+    if not isinstance(request, dict):
+        return _error(None, INVALID_REQUEST, "Request must be a JSON object")
+
+    is_v2 = request.get("jsonrpc") == "2.0"
+    request_id = request.get("id")
+    method = request.get("method", "query")
+
+    if is_v2:
+        if "method" not in request:
+            return None  # a response from the client; the plugin only sends notifications
+        if not isinstance(method, str):
+            return _error(request_id, INVALID_REQUEST, "Method must be a string")
+        params = _from_flow_v2(method, request.get("params") or [])
+        if method == "initialize":
+            response = {"jsonrpc": "2.0", "id": request_id, "result": {}}
+            return response if "id" in request else None
+        if method.startswith(FLOW_API_PREFIX):
+            response = _forward_to_flow(request_id, method, params, notify)
+            return response if "id" in request else None
+        request = dict(request, params=params)
+
+    try:
+        payload = plugin.handle_request(request)
+    except UnknownMethod as e:
+        logging.error("Server request failed: %s", e)
+        response = _error(request_id, METHOD_NOT_FOUND, str(e))
+    except Exception as e:
+        logging.error("Server request failed: %s", e)
+        response = _error(request_id, INTERNAL_ERROR, str(e))
+    else:
+        if not is_v2:
+            return payload
+        if method not in RESULT_METHODS:
+            # Flow reads an action's answer as whether to hide its window
+            payload = {"Hide": True}
+        response = {"jsonrpc": "2.0", "id": request_id, "result": payload}
+
+    if is_v2 and "id" not in request:
+        return None
+    if not is_v2:
+        return _error_rows(response["error"]["message"])
+    return response
+
+
+def serve(plugin, stdin=None, stdout=None) -> None:
+    """Serve requests until stdin is closed; ``stdout`` is a binary stream."""
+    # Requests and responses are UTF-8 whatever the console encoding is
+    stdin = stdin if stdin is not None else io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
+    stdout = stdout if stdout is not None else sys.stdout.buffer
+
+    if use_fast_encoder():
+        logging.debug("Encoding responses with orjson")
+    def notify(message):
+        stdout.write(encode(message))
+        stdout.flush()
+
+    plugin.start_watching()
+    logging.debug("Serving JSON-RPC requests on stdin")
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        response = handle_line(plugin, line, notify)
+        if response is not None:
+            started = perf_counter_ns()
+            output = _encode_response(response)
+            plugin.latency.lap("serialize", started)
+            stdout.write(output)
+            stdout.flush()
+        # Off the response path: the client already has its answer
+        plugin.latency.flush()
+    logging.debug("stdin closed, server exiting")
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Per-stage latency histograms.
+
+Hot-path stages are timed with ``time.perf_counter_ns`` and counted into
+log-scale buckets (four per power of two, so a bucket spans ~19%), which
+keeps the histogram a small dict however many samples it holds and makes
+merging samples from many plugin processes a matter of adding counts.
+
+Samples are kept in memory during a request and merged into a marshal file
+by ``flush``, after the response has been written. Percentiles are read
+back from the bucket bounds, so they are accurate to within one bucket.
+"""
+
+import logging
+import marshal
+import math
+import os
+from time import perf_counter_ns
+from typing import Dict, List, Optional, Tuple
+
+from folderlist.storage import atomic_write, file_lock
+
+# Stages in display order
+STAGES = ("settings", "keywords", "enumerate", "walk", "index", "filter", "sort", "build", "serialize", "query")
+
+BUCKETS_PER_OCTAVE = 4
+
+# Bumped whenever the stored histogram layout changes
+STATS_FORMAT = 1
+
+Histograms = Dict[str, Dict[int, int]]
+
+
+def bucket_for(elapsed_ns: int) -> int:
+    return int(math.log2(max(elapsed_ns, 1)) * BUCKETS_PER_OCTAVE)
+
+
+def bucket_upper_ns(bucket: int) -> float:
+    return 2 ** ((bucket + 1) / BUCKETS_PER_OCTAVE)
+
+
+def percentile(histogram: Dict[int, int], pct: float) -> float:
+    """Upper bound (in ns) of the bucket holding the ``pct`` percentile."""
+    total = sum(histogram.values())
+    if not total:
+        return 0.0
+    rank = pct / 100 * total
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= rank:
+            return bucket_upper_ns(bucket)
+    return bucket_upper_ns(max(histogram))
+
+
+def format_ns(ns: float) -> str:
+    if ns < 1e6:
+        return f"{ns / 1e3:.0f}µs"
+    return f"{ns / 1e6:.1f}ms"
+
+
+def format_age(ns: float) -> str:
+    seconds = ns / 1e9
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} min"
+    if seconds < 86400:
+        return f"{seconds / 3600:.0f} h"
+    return f"{seconds / 86400:.0f} d"
+
+
+class LatencyStats:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._pending: Histograms = {}
+
+    def record(self, stage: str, elapsed_ns: int) -> None:
+        counts = self._pending.setdefault(stage, {})
+        bucket = bucket_for(elapsed_ns)
+        counts[bucket] = counts.get(bucket, 0) + 1
+
+    def lap(self, stage: str, start_ns: int) -> int:
+        """Record the time since ``start_ns`` under ``stage``; returns now, to start the next stage."""
+        now = perf_counter_ns()
+        self.record(stage, now - start_ns)
+        return now
+
+    def _load(self) -> Histograms:
+        if not self.path:
+            return {}
+        try:
+            with open(self.path, "rb") as f:
+                stats_format, histograms = marshal.loads(f.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return {}
+        return histograms if stats_format == STATS_FORMAT else {}
+
+    def histograms(self) -> Histograms:
+        """Stored samples plus those not flushed yet."""
+        merged = self._load()
+        for stage, counts in self._pending.items():
+            target = merged.setdefault(stage, {})
+            for bucket, count in counts.items():
+                target[bucket] = target.get(bucket, 0) + count
+        return merged
+
+    def summary(self) -> List[Tuple[str, int, float, float, float]]:
+        """``(stage, samples, p50_ns, p95_ns, p99_ns)`` for every stage with samples."""
+        histograms = self.histograms()
+        rows = []
+        for stage in STAGES + tuple(sorted(set(histograms) - set(STAGES))):
+            histogram = histograms.get(stage)
+            if histogram:
+                rows.append((stage, sum(histogram.values()),
+                             *(percentile(histogram, pct) for pct in (50, 95, 99))))
+        return rows
+
+    def flush(self) -> None:
+        """Merge pending samples into the stats file."""
+        if not self.path or not self._pending:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Processes of consecutive keystrokes flush at about the same time;
+            # without the lock, one merge would overwrite the other's samples
+            with file_lock(self.path):
+                atomic_write(self.path, marshal.dumps((STATS_FORMAT, self.histograms())), fsync=False)
+            self._pending = {}
+        except OSError as e:
+            logging.warning("Could not save latency stats: %s", e)
+
+    def reset(self) -> None:
+        self._pending = {}
+        if self.path:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent filename index of a keyword's folder tree.
+
+``keyword ** term`` searches would otherwise walk the whole tree on every
+keystroke. A ``TreeIndex`` holds one record per folder:
+
+    (path, depth, mtime_ns, names, keys, kinds, sizes, mtimes)
+
+where ``names`` and ``keys`` (casefolded names) are joined with NUL into a
+single string, ``kinds`` is a bytes object (1 for folders) and ``sizes``
+and ``mtimes`` are packed ``array('q')`` bytes (-1 when unknown). Few large
+objects instead of a tuple per entry make the marshal file load in
+milliseconds, and let a search skip a whole folder with one ``in`` test on
+``keys`` before splitting out any names.
+
+The index is built by a detached ``python -m folderlist.tree_index``
+process, so neither a one-shot query nor the server waits for it. A
+refresh re-stats every indexed folder and re-scans only those whose mtime
+changed (adding or removing a child bumps the folder mtime); unchanged
+folders keep their records. Each build also writes a ``TrigramIndex`` of
+the names, which answers substring and prefix searches of three or more
+characters without visiting every folder.
+"""
+
+import json
+import logging
+import marshal
+import os
+import struct
+import sys
+import time
+from array import array
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from folderlist import fuzzy
+from folderlist.cache import cache_key
+from folderlist.filtering import EntryFilter, key_matches
+from folderlist.listing import Entry
+from folderlist.storage import RACY_WINDOW_NS, atomic_write
+from folderlist.trigram import TrigramIndex, open_trigrams, trigram_file_for, write_trigrams
+from folderlist.walker import WalkOptions
+
+# Bumped whenever the folder record layout changes
+INDEX_FORMAT = 1
+
+# A build marker older than this belongs to a build that died
+BUILD_TIMEOUT_NS = 600 * 1_000_000_000
+
+# What build_in_background did
+BUILD_STARTED = "started"
+BUILD_RUNNING = "running"  # another build of the same index is under way
+BUILD_FAILED = "failed"
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_unpack_int64 = struct.Struct("q").unpack_from
+
+Record = Tuple[str, int, Optional[int], str, str, bytes, bytes, bytes]
+
+
+class TreeIndex(NamedTuple):
+    root: str
+    built_ns: int  # wall-clock time the build started
+    complete: bool  # False if the build stopped at max_entries
+    entry_count: int
+    dirs: List[Record]
+    trigrams: Optional[TrigramIndex] = None
+
+    def age_ns(self) -> int:
+        return time.time_ns() - self.built_ns
+
+    def search(self, entry_filter: EntryFilter) -> Iterator[Entry]:
+        """Yield the indexed entries whose name matches ``entry_filter``."""
+        needle = entry_filter.needle
+        if self.trigrams is not None and entry_filter.mode != "fuzzy":
+            ids = self.trigrams.search(needle, prefix=entry_filter.mode == "prefix")
+            if ids is not None:
+                yield from self._entries(ids)
+                return
+
+        fuzzy_mode = entry_filter.mode == "fuzzy"
+        for path, _, _, names, keys, kinds, sizes, mtimes in self.dirs:
+            # The needle never contains NUL, so a hit in the joined keys lies
+            # within one key; folders without one are skipped unsplit
+            if fuzzy_mode:
+                if not fuzzy.is_match(needle, keys):
+                    continue
+            elif needle not in keys:
+                continue
+            name_list = None
+            for i, key in enumerate(keys.split("\0")):
+                if not key_matches(entry_filter, key):
+                    continue
+                if name_list is None:
+                    name_list = names.split("\0")
+                    size_list = array("q", sizes)
+                    mtime_list = array("q", mtimes)
+                yield Entry(name_list[i], path, kinds[i] == 1, key, size_list[i], mtime_list[i])
+
+    def _entries(self, ids: List[int]) -> Iterator[Entry]:
+        """The entries with the given trigram index ids, which must be ascending."""
+        current = -1
+        for folder, i in self.trigrams.locate(ids):
+            if folder != current:
+                current = folder
+                path, _, _, names, _, kinds, sizes, mtimes = self.dirs[folder]
+                name_list = names.split("\0")
+            # Hits are usually sparse within a folder: unpack just this entry
+            name = name_list[i]
+            yield Entry(name, path, kinds[i] == 1, name.casefold(),
+                        _unpack_int64(sizes, 8 * i)[0], _unpack_int64(mtimes, 8 * i)[0])
+
+
+def index_file_for(index_dir: str, root: str) -> str:
+    import hashlib
+    digest = hashlib.sha1(cache_key(root).encode("utf-8", "surrogatepass")).hexdigest()
+    return os.path.join(index_dir, digest + ".tree")
+
+
+def load_index(index_file: str, root: str) -> Optional[TreeIndex]:
+    """The index stored for ``root``, or None if there is no usable one."""
+    try:
+        with open(index_file, "rb") as f:
+            index_format, key, built_ns, complete, entry_count, dirs = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if index_format != INDEX_FORMAT or key != cache_key(root):
+        return None
+    trigrams = open_trigrams(trigram_file_for(index_file, built_ns), built_ns)
+    return TreeIndex(root, built_ns, complete, entry_count, dirs, trigrams)
+
+
+def save_index(index_file: str, index: TreeIndex) -> None:
+    os.makedirs(os.path.dirname(index_file), exist_ok=True)
+    # Trigrams first: once the new index file is in place it refers to them
+    write_trigrams(index_file, index.built_ns, (record[4] for record in index.dirs))
+    atomic_write(index_file, marshal.dumps((
+        INDEX_FORMAT, cache_key(index.root), index.built_ns, index.complete,
+        index.entry_count, index.dirs
+    )), fsync=False)
+
+
+def _scan_record(path: str, depth: int, mtime_ns: Optional[int]) -> Record:
+    names = []
+    keys = []
+    kinds = bytearray()
+    sizes = array("q")
+    mtimes = array("q")
+    try:
+        with os.scandir(path) as it:
+            for item in it:
+                try:
+                    is_dir = item.is_dir(follow_symlinks=False)
+                    st = item.stat(follow_symlinks=False)
+                    size, mtime = st.st_size, st.st_mtime_ns
+                except OSError:
+                    is_dir, size, mtime = False, -1, -1
+                name = item.name
+                names.append(name)
+                keys.append(name.casefold())
+                kinds.append(is_dir)
+                sizes.append(size)
+                mtimes.append(mtime)
+    except OSError as e:
+        logging.debug("Could not index %s: %s", path, e)
+    return (path, depth, mtime_ns, "\0".join(names), "\0".join(keys),
+            bytes(kinds), sizes.tobytes(), mtimes.tobytes())
+
+
+def build_index(root: str, options: WalkOptions, max_entries: int,
+                previous: Optional[TreeIndex] = None) -> Tuple[TreeIndex, int]:
+    """
+    Index the tree below ``root``, reusing the records of ``previous`` for
+    folders whose mtime is unchanged. Returns the index and the number of
+    folders that had to be scanned.
+    """
+    built_ns = time.time_ns()
+    reusable: Dict[str, Record] = {record[0]: record for record in previous.dirs} if previous else {}
+    excluded = frozenset(name.casefold() for name in options.excluded)
+    dirs = []
+    entry_count = 0
+    scanned = 0
+    complete = True
+    pending = [(root, 1)]
+    while pending:
+        path, depth = pending.pop()
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+        record = reusable.get(path)
+        if record is None or record[2] != mtime_ns or record[1] != depth:
+            if built_ns - mtime_ns < RACY_WINDOW_NS:
+                # May change again within the same mtime tick; re-scan next refresh
+                mtime_ns = None
+            record = _scan_record(path, depth, mtime_ns)
+            scanned += 1
+        dirs.append(record)
+        entry_count += len(record[5])
+        if entry_count >= max_entries:
+            complete = False
+            break
+        if depth < options.max_depth:
+            _, _, _, names, keys, kinds, _, _ = record
+            for name, key, kind in zip(names.split("\0"), keys.split("\0"), kinds):
+                if kind and key not in excluded:
+                    pending.append((os.path.join(path, name), depth + 1))
+    return TreeIndex(root, built_ns, complete, entry_count, dirs), scanned
+
+
+def build_in_background(root: str, index_file: str, options: WalkOptions, max_entries: int) -> str:
+    """
+    Start a detached process that builds or refreshes the index of ``root``.
+    Returns BUILD_STARTED, BUILD_RUNNING if a build of it is already under
+    way, or BUILD_FAILED if none could be started.
+    """
+    marker = index_file + ".building"
+    try:
+        os.makedirs(os.path.dirname(index_file), exist_ok=True)
+        try:
+            os.close(os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            if time.time_ns() - os.stat(marker).st_mtime_ns < BUILD_TIMEOUT_NS:
+                return BUILD_RUNNING
+            os.remove(marker)
+            os.close(os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        # Another process won the race for a stale marker
+        return BUILD_RUNNING
+    except OSError as e:
+        logging.error("Could not start index build for %s: %s", root, e)
+        return BUILD_FAILED
+
+    import subprocess
+    job = {
+        "root": root, "index_file": index_file, "max_entries": max_entries,
+        "max_depth": options.max_depth, "excluded": list(options.excluded)
+    }
+    if os.name == "nt":
+        detach = {"creationflags": subprocess.CREATE_NO_WINDOW | subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        detach = {"start_new_session": True}
+    try:
+        subprocess.Popen(
+            [sys.executable, "-m", "folderlist.tree_index", json.dumps(job)],
+            cwd=PLUGIN_DIR, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL, close_fds=True, **detach
+        )
+    except OSError as e:
+        logging.error("Could not start index build for %s: %s", root, e)
+        try:
+            os.remove(marker)
+        except OSError:
+            pass
+        return BUILD_FAILED
+    return BUILD_STARTED
+
+
+def run_build(job: dict) -> None:
+    """Build or refresh one index as described by ``job``; the background process entry point."""
+    index_file = job["index_file"]
+    try:
+        options = WalkOptions(max_depth=job["max_depth"], excluded=job["excluded"])
+        previous = load_index(index_file, job["root"])
+        started = time.perf_counter()
+        index, scanned = build_index(job["root"], options, job["max_entries"], previous)
+        save_index(index_file, index)
+        logging.info("Indexed %s: %d entries, %d of %d folders scanned in %.1fs",
+                     job["root"], index.entry_count, scanned, len(index.dirs),
+                     time.perf_counter() - started)
+    finally:
+        try:
+            os.remove(index_file + ".building")
+        except OSError:
+            pass
+
+
+if __name__ == "__main__":
+    from folderlist import logs
+    logs.configure(os.path.join(PLUGIN_DIR, "folder_list_plugin.log"))
+    try:
+        run_build(json.loads(sys.argv[1]))
+    except Exception as e:
+        logging.error("Index build failed: %s", e)
+        raise
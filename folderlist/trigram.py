@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+Trigram index over the names of a ``TreeIndex``.
+
+Substring and prefix searches of at least three bytes are answered without
+scanning every name: each entry of the tree index gets an id (its position
+when the folder records are read in order), and every byte trigram of an
+entry's casefolded UTF-8 name lists the ids containing it. A search decodes
+the shortest posting list of the needle's trigrams, intersects it with
+the other lists that are short enough to be worth decoding, and verifies
+the remaining candidates against the stored names.
+
+The file is laid out for ``mmap`` so opening it reads nothing up front:
+
+    header        magic, tree build time, entry/folder/trigram counts, sizes
+    grams         sorted trigram keys, uint32
+    post_offsets  start of each trigram's postings in ``postings``, uint32
+    dir_starts    id of the first entry of each folder record, uint32
+    key_offsets   start of each entry's name in ``keys``, uint32
+    postings      ascending ids as LEB128 varints of their deltas
+    keys          casefolded names, UTF-8, concatenated
+
+Files are named after the tree index build they belong to, so a refresh
+writes a new file instead of replacing one that a running process may
+still have mapped (which Windows does not allow).
+"""
+
+import glob
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from folderlist.storage import atomic_write
+
+MAGIC = b"FLTRI\x00\x00\x01"
+HEADER = struct.Struct("<8sQIIIIII")  # magic, built_ns, entries, dirs, grams, postings, keys, padding
+
+# Another posting list is decoded and intersected only while it is at most
+# this many bytes per remaining candidate; past that, verifying is cheaper
+INTERSECT_BYTES_PER_CANDIDATE = 2
+
+
+def trigram_file_for(index_file: str, built_ns: int) -> str:
+    return f"{os.path.splitext(index_file)[0]}.{built_ns}.tri"
+
+
+def _encode_postings(ids: List[int], out: bytearray) -> None:
+    last = 0
+    for entry_id in ids:
+        delta = entry_id - last
+        last = entry_id
+        while delta >= 0x80:
+            out.append(delta & 0x7F | 0x80)
+            delta >>= 7
+        out.append(delta)
+
+
+def _decode_postings(data: bytes) -> List[int]:
+    if data.isascii():
+        # Every delta fits in one byte, as in the long lists of common trigrams
+        return list(accumulate(data))
+    ids = []
+    last = value = shift = 0
+    for byte in data:
+        if byte & 0x80:
+            value |= (byte & 0x7F) << shift
+            shift += 7
+        else:
+            last += value | (byte << shift)
+            ids.append(last)
+            value = shift = 0
+    return ids
+
+
+def _u32(values: Iterable[int]) -> bytes:
+    return array("I", values).tobytes()
+
+
+def build_trigrams(built_ns: int, folders: Iterable[str]) -> bytes:
+    """
+    Serialize a trigram index over ``folders``: the NUL-joined casefolded
+    names of each folder record, in the tree index's order.
+    """
+    postings: Dict[bytes, List[int]] = {}
+    dir_starts = [0]
+    key_offsets = [0]
+    keys = bytearray()
+    entry_id = 0
+    for joined in folders:
+        # An empty folder has no names at all, not one empty name
+        for key in joined.split("\0") if joined else ():
+            data = key.encode("utf-8", "surrogatepass")
+            keys += data
+            key_offsets.append(len(keys))
+            for gram in {data[i:i + 3] for i in range(len(data) - 2)}:
+                ids = postings.get(gram)
+                if ids is None:
+                    postings[gram] = [entry_id]
+                else:
+                    ids.append(entry_id)
+            entry_id += 1
+        dir_starts.append(entry_id)
+
+    grams = sorted(postings)
+    post_offsets = [0]
+    blob = bytearray()
+    for gram in grams:
+        _encode_postings(postings[gram], blob)
+        post_offsets.append(len(blob))
+
+    header = HEADER.pack(MAGIC, built_ns, entry_id, len(dir_starts) - 1, len(grams),
+                         len(blob), len(keys), 0)
+    return b"".join((
+        header, _u32(int.from_bytes(gram, "big") for gram in grams), _u32(post_offsets),
+        _u32(dir_starts), _u32(key_offsets), bytes(blob), bytes(keys)
+    ))
+
+
+def write_trigrams(index_file: str, built_ns: int, folders: Iterable[str]) -> str:
+    """Write the trigram file for one tree index build and remove older ones."""
+    path = trigram_file_for(index_file, built_ns)
+    atomic_write(path, build_trigrams(built_ns, folders), fsync=False)
+    for stale in glob.glob(glob.escape(os.path.splitext(index_file)[0]) + ".*.tri"):
+        if stale != path:
+            try:
+                os.remove(stale)
+            except OSError:
+                # Still mapped by a running process on Windows; removed next time
+                pass
+    return path
+
+
+class TrigramIndex:
+    def __init__(self, data: mmap.mmap):
+        magic, self.built_ns, entries, dirs, grams, postings, keys, _ = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("not a trigram index")
+        self._data = data
+        view = memoryview(data)
+        offset = HEADER.size
+
+        def table(count: int) -> memoryview:
+            nonlocal offset
+            section = view[offset:offset + 4 * count].cast("I")
+            offset += 4 * count
+            return section
+
+        self.grams = table(grams)
+        self.post_offsets = table(grams + 1)
+        self.dir_starts = table(dirs + 1)
+        self.key_offsets = table(entries + 1)
+        self.postings_start = offset
+        self.keys_start = offset + postings
+        if self.keys_start + keys > len(data):
+            raise ValueError("truncated trigram index")
+        self.entry_count = entries
+        self._dir_starts_list: Optional[List[int]] = None
+
+    def _postings(self, slot: int) -> List[int]:
+        start = self.postings_start + self.post_offsets[slot]
+        return _decode_postings(self._data[start:self.postings_start + self.post_offsets[slot + 1]])
+
+    def search(self, needle: str, prefix: bool = False) -> Optional[List[int]]:
+        """
+        Ids of the entries whose name contains (or, with ``prefix``, starts
+        with) ``needle``, ascending; None if the needle is too short to use
+        the index.
+        """
+        data = needle.encode("utf-8", "surrogatepass")
+        if len(data) < 3:
+            return None
+        slots = []
+        for gram in {int.from_bytes(data[i:i + 3], "big") for i in range(len(data) - 2)}:
+            slot = bisect_left(self.grams, gram)
+            if slot == len(self.grams) or self.grams[slot] != gram:
+                return []
+            slots.append((self.post_offsets[slot + 1] - self.post_offsets[slot], slot))
+        slots.sort()
+
+        candidates = self._postings(slots[0][1])
+        for size, slot in slots[1:]:
+            if size > INTERSECT_BYTES_PER_CANDIDATE * len(candidates):
+                break
+            other = set(self._postings(slot))
+            candidates = [entry_id for entry_id in candidates if entry_id in other]
+
+        if len(data) == 3 and not prefix:
+            return candidates  # the needle is its own only trigram
+
+        # Verify: the trigrams may all occur without occurring in sequence
+        found = []
+        keys = self._data
+        keys_start = self.keys_start
+        key_offsets = self.key_offsets
+        length = len(data)
+        for entry_id in candidates:
+            start = keys_start + key_offsets[entry_id]
+            end = keys_start + key_offsets[entry_id + 1]
+            if prefix:
+                if end - start >= length and keys[start:start + length] == data:
+                    found.append(entry_id)
+            elif keys.find(data, start, end) >= 0:
+                found.append(entry_id)
+        return found
+
+    def locate(self, ids: List[int]) -> Iterator[Tuple[int, int]]:
+        """Map ascending entry ids to ``(folder record index, position in the folder)``."""
+        if self._dir_starts_list is None:
+            # bisect on a list is several times faster than on the mapped view
+            self._dir_starts_list = self.dir_starts.tolist()
+        dir_starts = self._dir_starts_list
+        folder = -1
+        next_start = 0
+        for entry_id in ids:
+            if entry_id >= next_start:
+                folder = bisect_right(dir_starts, entry_id) - 1
+                next_start = dir_starts[folder + 1]
+            yield folder, entry_id - dir_starts[folder]
+
+
+def open_trigrams(path: str, built_ns: int) -> Optional[TrigramIndex]:
+    """Map the trigram file at ``path``; None if it is missing or not from build ``built_ns``."""
+    try:
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        index = TrigramIndex(data)
+    except (OSError, ValueError, struct.error):
+        return None
+    if index.built_ns != built_ns:
+        return None
+    return index
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Parallel recursive directory walk.
+
+``TreeWalker`` enumerates a folder tree with a pool of ``os.scandir``
+worker threads sharing one queue of folders: a worker lists a folder and
+hands back its entries and subfolders, and the subfolders are queued for
+the next free worker. ``os.scandir`` releases the GIL while it waits on the
+disk, so several folders are read at once, which matters most on network
+shares and cold disks.
+
+Entries are yielded as soon as their folder has been read, so callers can
+rank matches while the walk is still running. Given a ``match`` predicate
+on the casefolded name, the workers only turn matching names into ``Entry``
+records, so a search over hundreds of thousands of names keeps just its
+hits. The walk never follows symlinks (a link to a folder is listed but not
+entered, so link loops end), skips excluded folder names and unreadable
+subfolders (an unreadable root is raised to the caller), and stops at
+``max_depth``, after ``max_entries`` entries or when ``time_budget`` runs
+out; ``complete`` then stays False.
+"""
+
+import os
+import queue
+import threading
+import time
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from folderlist.listing import Entry
+
+# Folder names never descended into unless the settings say otherwise
+DEFAULT_EXCLUDED = (".git", ".svn", ".hg", "__pycache__", "$recycle.bin", "system volume information")
+
+
+class WalkOptions(NamedTuple):
+    max_depth: int = 8
+    max_entries: int = 200_000
+    workers: int = 8
+    time_budget: float = 2.0  # seconds
+    excluded: Iterable[str] = DEFAULT_EXCLUDED
+
+
+def _scan(path: str, depth: int, descend: bool, excluded: frozenset,
+          match: Optional[Callable[[str], bool]]) -> Tuple[List[Entry], List[str], int, int]:
+    entries = []
+    subdirs = []
+    seen = 0
+    try:
+        with os.scandir(path) as it:
+            for item in it:
+                seen += 1
+                name = item.name
+                sort_key = name.casefold()
+                try:
+                    is_dir = item.is_dir(follow_symlinks=False)
+                except OSError:
+                    is_dir = False
+                if is_dir and descend and sort_key not in excluded:
+                    subdirs.append(item.path)
+                if match is None or match(sort_key):
+                    entries.append(Entry(name, path, is_dir, sort_key))
+    except OSError:
+        if depth == 1:
+            raise  # the root itself: reported to the caller like any listing error
+        # Unreadable subfolder (permissions, removed meanwhile): skip it
+    return entries, subdirs, depth, seen
+
+
+class TreeWalker:
+    def __init__(self, root: str, options: WalkOptions = WalkOptions(),
+                 match: Optional[Callable[[str], bool]] = None):
+        self.root = root
+        self.options = options
+        self.match = match
+        self.scanned = 0  # entries read, matching or not
+        self.complete = False
+
+    def _work(self, folders: "queue.SimpleQueue", results: "queue.SimpleQueue",
+              excluded: frozenset, stopped: threading.Event):
+        max_depth = self.options.max_depth
+        while True:
+            item = folders.get()
+            if item is None:
+                return
+            path, depth = item
+            if stopped.is_set():
+                continue
+            try:
+                results.put(_scan(path, depth, depth < max_depth, excluded, self.match))
+            except OSError as e:
+                results.put(e)
+
+    def __iter__(self) -> Iterator[Entry]:
+        options = self.options
+        excluded = frozenset(name.casefold() for name in options.excluded)
+        deadline = time.monotonic() + options.time_budget
+        folders = queue.SimpleQueue()
+        results = queue.SimpleQueue()
+        stopped = threading.Event()
+        # Daemon threads: a scandir hanging on a dead network share must not
+        # keep the process alive once the results have been written
+        workers = [threading.Thread(target=self._work, args=(folders, results, excluded, stopped),
+                                    name="folderlist-walk", daemon=True)
+                   for _ in range(max(1, options.workers))]
+        for worker in workers:
+            worker.start()
+
+        folders.put((self.root, 1))
+        outstanding = 1  # folders queued or being read
+        try:
+            while outstanding:
+                try:
+                    result = results.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    return  # out of time
+                if isinstance(result, OSError):
+                    raise result
+                entries, subdirs, depth, seen = result
+                outstanding += len(subdirs) - 1
+                for subdir in subdirs:
+                    folders.put((subdir, depth + 1))
+                yield from entries
+                self.scanned += seen
+                if self.scanned >= options.max_entries:
+                    return
+            self.complete = True
+        finally:
+            stopped.set()
+            for _ in workers:
+                folders.put(None)
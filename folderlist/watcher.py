@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+Filesystem change notification for the long-lived server mode.
+
+A watcher subscribes to a bounded set of folders (keyword roots and
+recently listed folders; the least recently used watch is dropped once
+``max_watches`` is reached) and reports what changed in them as ``Change``
+records, which ``ListingCache.sync`` applies to the cached listings:
+
+- ``InotifyWatcher`` (Linux) uses inotify through ctypes and reports each
+  added, removed, renamed or modified child by name, so a listing is
+  patched without re-reading the folder. ``changes`` is one non-blocking
+  ``read`` of the inotify descriptor.
+- ``PollingWatcher`` (everywhere else) stats the watched folders from a
+  background thread every ``interval`` seconds and reports a folder whose
+  ``(mtime_ns, inode)`` changed as ``RESCAN``. A folder modified within the
+  last mtime tick window is reported again on the next poll, since a
+  further change in the same tick would not move its mtime.
+
+Either way a watched folder's listing is known to be current without a
+``stat`` per query; only folders reported as changed are looked at again.
+"""
+
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from folderlist.storage import RACY_WINDOW_NS
+
+ADDED = "added"
+REMOVED = "removed"
+MODIFIED = "modified"
+RESCAN = "rescan"  # the folder changed in an unknown way, or is gone
+UNWATCHED = "unwatched"  # the watch was dropped to stay within max_watches
+OVERFLOW = "overflow"  # events were lost: nothing watched can be trusted
+
+
+class Change(NamedTuple):
+    key: Optional[str]  # cache key of the folder; None for OVERFLOW
+    folder: str  # the folder's path as it was watched
+    kind: str
+    name: str = ""
+    is_dir: bool = False
+
+
+class Watcher:
+    """A bounded LRU set of watched folders; subclasses do the watching."""
+
+    def __init__(self, max_watches: int = 256):
+        self.max_watches = max_watches
+        # key -> (path, backend handle)
+        self._watched: "OrderedDict[str, Tuple[str, object]]" = OrderedDict()
+        self._dropped: List[Change] = []
+
+    def is_watching(self, key: str) -> bool:
+        return key in self._watched
+
+    def watch(self, key: str, path: str) -> bool:
+        """Watch ``path`` (cache key ``key``); returns whether it is watched."""
+        if key in self._watched:
+            self._watched.move_to_end(key)
+            return True
+        handle = self._add(key, path)
+        if handle is None:
+            return False
+        self._watched[key] = (path, handle)
+        while len(self._watched) > self.max_watches:
+            evicted, (evicted_path, evicted_handle) = self._watched.popitem(last=False)
+            self._remove(evicted_handle)
+            self._dropped.append(Change(evicted, evicted_path, UNWATCHED))
+        return True
+
+    def changes(self) -> List[Change]:
+        """Changes since the last call, without blocking."""
+        dropped, self._dropped = self._dropped, []
+        return dropped + self._read()
+
+    def close(self) -> None:
+        for _, handle in self._watched.values():
+            self._remove(handle)
+        self._watched.clear()
+
+    def _add(self, key: str, path: str) -> Optional[object]:
+        raise NotImplementedError
+
+    def _remove(self, handle: object) -> None:
+        raise NotImplementedError
+
+    def _read(self) -> List[Change]:
+        raise NotImplementedError
+
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class InotifyWatcher(Watcher):
+    def __init__(self, max_watches: int = 256):
+        import ctypes
+        super().__init__(max_watches)
+        # The symbols already loaded into the process, libc among them
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self._libc.inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._keys: Dict[int, Tuple[str, str]] = {}  # watch descriptor -> (cache key, path)
+
+    def _add(self, key: str, path: str) -> Optional[int]:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            # ENOSPC once fs.inotify.max_user_watches is used up
+            import ctypes
+            logging.debug("Cannot watch %s: %s", path, os.strerror(ctypes.get_errno()))
+            return None
+        self._keys[wd] = (key, path)
+        return wd
+
+    def _remove(self, wd: int) -> None:
+        self._keys.pop(wd, None)
+        self._libc.inotify_rm_watch(self._fd, wd)
+
+    def _read(self) -> List[Change]:
+        changes = []
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                return changes
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                name = os.fsdecode(data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0"))
+                offset += _EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    changes.append(Change(None, "", OVERFLOW))
+                    continue
+                watched = self._keys.get(wd)
+                if watched is None:
+                    continue
+                key, folder = watched
+                is_dir = bool(mask & IN_ISDIR)
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    changes.append(Change(key, folder, ADDED, name, is_dir))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    changes.append(Change(key, folder, REMOVED, name, is_dir))
+                elif mask & (IN_MODIFY | IN_ATTRIB):
+                    if name:
+                        changes.append(Change(key, folder, MODIFIED, name, is_dir))
+                elif mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                    # The folder itself is gone or moved: stop trusting it
+                    self._keys.pop(wd, None)
+                    self._watched.pop(key, None)
+                    changes.append(Change(key, folder, RESCAN))
+
+    def close(self) -> None:
+        super().close()
+        os.close(self._fd)
+
+
+class PollingWatcher(Watcher):
+    def __init__(self, max_watches: int = 256, interval: float = 2.0):
+        super().__init__(max_watches)
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._pending: "queue.SimpleQueue[Change]" = queue.SimpleQueue()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._poll_loop, name="folderlist-poll", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if time.time_ns() - st.st_mtime_ns < RACY_WINDOW_NS:
+            # Differs from the settled signature, so the folder is reported
+            # again once its mtime tick has passed
+            return (None, st.st_ino)
+        return (st.st_mtime_ns, st.st_ino)
+
+    def _add(self, key: str, path: str) -> Optional[list]:
+        signature = self._signature(path)
+        if signature is None:
+            return None
+        # A list so the poll thread can update the signature in place
+        return [signature]
+
+    def watch(self, key: str, path: str) -> bool:
+        with self._lock:
+            return super().watch(key, path)
+
+    def _remove(self, handle: list) -> None:
+        pass
+
+    def _read(self) -> List[Change]:
+        changes = []
+        while True:
+            try:
+                changes.append(self._pending.get_nowait())
+            except queue.Empty:
+                return changes
+
+    def _poll_loop(self) -> None:
+        while not self._closed.wait(self.interval):
+            with self._lock:
+                watched = list(self._watched.items())
+            for key, (path, handle) in watched:
+                current = self._signature(path)
+                if current != handle[0]:
+                    handle[0] = current
+                    self._pending.put(Change(key, path, RESCAN))
+
+    def close(self) -> None:
+        self._closed.set()
+        with self._lock:
+            super().close()
+
+
+def create_watcher(max_watches: int = 256, poll_interval: float = 2.0) -> Watcher:
+    """An inotify watcher where available, otherwise a polling one."""
+    if hasattr(os, "uname") and os.uname().sysname == "Linux":
+        try:
+            return InotifyWatcher(max_watches)
+        except (OSError, AttributeError) as e:
+            logging.warning("inotify unavailable, polling folders instead: %s", e)
+    return PollingWatcher(max_watches, poll_interval)
@@ -1,69 +1,383 @@
 # -*- coding: utf-8 -*-
 
 import sys
-from pathlib import Path
 import os
 import json
 import logging
-from typing import List, Dict, Any
-from flowlauncher import FlowLauncher
+from time import perf_counter_ns, strftime
+from typing import List, Dict, Any, Optional, Tuple
 
-# Set up logging
-plugindir = Path.absolute(Path(__file__).parent)
+# os.path rather than pathlib: pathlib alone costs more to import than the
+# rest of the query path
+plugindir = os.path.dirname(os.path.abspath(__file__))
+paths = (".", "lib")
+sys.path = [os.path.join(plugindir, p) for p in paths] + sys.path
+
+from folderlist.cache import ListingCache, cache_key
+from folderlist import RESULT_METHODS, UnknownMethod, fuzzy, logs
+from folderlist.filtering import parse_filter
+from folderlist.keywords import KeywordIndex
+from folderlist.pipeline import Page, list_page, rank_page, search_page
+from folderlist.serialize import Fragment, encode, entry_fragment
+from folderlist.stats import LatencyStats, format_age, format_ns
+from folderlist.storage import atomic_write_json, file_lock, file_signature, read_snapshot, write_snapshot
+
+# Set up logging; the level and rotation are reconfigured from settings once loaded
 log_file = os.path.join(plugindir, 'folder_list_plugin.log')
-logging.basicConfig(
-    filename=log_file,
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
+logs.configure(log_file)
+
+# Keyword results are scored above every folder entry
+KEYWORD_SCORE = 10000
+
+# Skipped keywords listed under the import preview
+IMPORT_PREVIEW_SKIPPED = 5
+
+# JSON-RPC methods callers may invoke; any other name is rejected
+RPC_METHODS = (
+    "query", "context_menu", "open_path", "run",
+    "set_keyword", "import_keywords", "export_keywords", "reset_stats",
+    "dismiss_settings_warning"
 )
 
-class FolderListPlugin(FlowLauncher):
-    def __init__(self):
+
+class FolderListPlugin:
+    def __init__(self, dispatch: bool = True):
         try:
             logging.debug("Initializing FolderListPlugin")
-            self.settings_file = os.path.join(plugindir, 'settings.json')
+            self.settings_file = os.environ.get(
+                'FOLDERLIST_SETTINGS', os.path.join(plugindir, 'settings.json')
+            )
+            # Parsed settings and keyword index, reused while settings.json is unchanged
+            self.snapshot_file = os.path.splitext(self.settings_file)[0] + '.snapshot'
+            # Keywords added since the last save; written once per request
+            self.pending_keywords: Dict[str, str] = {}
+            # One-shot processes exit after this request, taking unfinished work with them
+            self.one_shot = dispatch
+            started = perf_counter_ns()
             self.load_settings()
-            super().__init__()
+            self.latency = self.create_latency_stats()
+            self.latency.lap("settings", started)
+            self.configure_logging()
+            self.listing_cache = self.create_listing_cache()
+            # Lists the folders of several matched keywords at once; created on first use
+            self.listing_pool = None
+            # Loaded folder tree indexes by index file, with the file's signature
+            self.tree_indexes: Dict[str, Tuple[Tuple[int, int, int], "TreeIndex"]] = {}
+            # Cache keys of watched folders that changed since their tree was last re-indexed
+            self.changed_folders = set()
+            self.debugMessage = ""
+            if dispatch:
+                # One-shot mode: handle the JSON-RPC request passed in argv.
+                # Long-lived mode calls handle_request for each request later.
+                self.handle_argv(sys.argv)
             logging.debug("FolderListPlugin initialized successfully")
         except Exception as e:
-            logging.error(f"Error initializing plugin: {str(e)}")
+            logging.error("Error initializing plugin: %s", e)
             raise
 
+    def handle_argv(self, argv: List[str]):
+        """Handle the request Flow Launcher passes as argv[1], writing any results to stdout."""
+        request = json.loads(argv[1]) if len(argv) > 1 else {"method": "query", "parameters": [""]}
+        try:
+            response = self.handle_request(request)
+        except UnknownMethod as e:
+            logging.error("Rejected request: %s", e)
+            self.write_output(encode({
+                "result": [{
+                    "Title": "Error",
+                    "SubTitle": str(e),
+                    "IcoPath": "images/app.png"
+                }],
+                "debugMessage": ""
+            }))
+            return
+        if request.get("method", "query") in RESULT_METHODS:
+            started = perf_counter_ns()
+            output = encode(response)
+            self.latency.lap("serialize", started)
+            self.write_output(output)
+        self.latency.flush()
+        self.finish_listings()
+
+    def write_output(self, output: bytes):
+        # UTF-8 bytes, whatever encoding the console's text stream uses
+        sys.stdout.buffer.write(output)
+        sys.stdout.buffer.flush()
+
+    def finish_listings(self):
+        """
+        Give folders that missed the time budget a chance to reach the
+        persistent cache once the response is out, so the next keystroke's
+        process shows them instead of "still listing".
+        """
+        if self.listing_pool is None or not self.listing_cache.cache_dir or not self.listing_pool.busy():
+            return
+        # Flow Launcher reads the response until stdout is closed, not until the process exits
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        os.close(devnull)
+        linger = self.settings.get("parallel_listing", {}).get("linger_ms", 5000) / 1000
+        if not self.listing_pool.wait(linger):
+            logging.debug("Gave up waiting for slow folders after %.1fs", linger)
+        self.listing_cache.flush()
+
+    def handle_request(self, request: Dict[str, Any]) -> Any:
+        """Dispatch one JSON-RPC request and return the method's response payload."""
+        method_name = request.get("method", "query")
+        parameters = request.get("params", request.get("parameters", []))
+
+        method = RPC_TABLE.get(method_name)
+        if method is None:
+            raise UnknownMethod(f"Unknown method: {method_name}")
+
+        self.debugMessage = ""
+        started = perf_counter_ns()
+        self.sync_changes()
+        try:
+            results = method(self, *parameters)
+        finally:
+            self.flush_settings()
+        if method_name == "query":
+            self.latency.lap("query", started)
+            backup = self.settings.get("corrupt_settings_backup")
+            if backup:
+                results = [self.settings_warning_result(backup)] + results
+        if method_name in RESULT_METHODS:
+            return {
+                "result": results,
+                "debugMessage": self.debugMessage
+            }
+        return results
+
     def load_settings(self):
+        self.keyword_index = None
         try:
-            if os.path.exists(self.settings_file):
-                with open(self.settings_file, 'r', encoding='utf-8') as f:
-                    self.settings = json.load(f)
+            try:
+                signature = file_signature(self.settings_file)
+            except FileNotFoundError:
+                signature = None
+            snapshot = read_snapshot(self.snapshot_file, signature) if signature else None
+            if snapshot is not None:
+                self.settings, index_state = snapshot
+                self.keyword_index = KeywordIndex.from_state(index_state)
             else:
-                self.settings = {"keywords": {}}
-                self.save_settings()
-            logging.debug(f"Loaded settings: {self.settings}")
+                settings = self.read_settings_file() if signature else None
+                if settings is None:
+                    self.settings = {"keywords": {}}
+                    self.save_settings()
+                else:
+                    self.settings = settings
+                    self.keyword_index = KeywordIndex(settings["keywords"])
+                    self.save_snapshot(signature)
+            logging.debug("Loaded settings with %d keywords", len(self.settings['keywords']))
         except json.JSONDecodeError:
-            logging.error("Invalid settings file format")
             self.settings = {"keywords": {}}
-            self.save_settings()
+            self.backup_corrupt_settings()
         except Exception as e:
-            logging.error(f"Error loading settings: {str(e)}")
+            logging.error("Error loading settings: %s", e)
             self.settings = {"keywords": {}}
+        if self.keyword_index is None:
+            self.keyword_index = KeywordIndex(self.settings["keywords"])
+
+    def backup_corrupt_settings(self):
+        """
+        Move an unparsable settings file aside, never over an earlier backup,
+        and start fresh settings that remember where the old keywords went.
+        """
+        stamp = strftime("%Y%m%d-%H%M%S")
+        backup = f"{self.settings_file}.corrupt-{stamp}"
+        attempt = 1
+        while os.path.exists(backup):
+            backup = f"{self.settings_file}.corrupt-{stamp}-{attempt}"
+            attempt += 1
+        try:
+            os.replace(self.settings_file, backup)
+        except OSError as e:
+            # Most likely another plugin process moved it first
+            logging.error("Could not move invalid settings file: %s", e)
+            return
+        logging.error("Invalid settings file format, moved to %s", backup)
+        self.settings["corrupt_settings_backup"] = backup
+        try:
+            self.save_settings()
+        except Exception:
+            pass  # logged by save_settings; the warning then shows for this request only
+
+    def save_snapshot(self, signature: Tuple[int, int, int]):
+        try:
+            write_snapshot(self.snapshot_file, signature, (self.settings, self.keyword_index.state()))
+        except (OSError, ValueError) as e:
+            logging.warning("Could not save settings snapshot: %s", e)
+
+    def configure_logging(self):
+        log_settings = self.settings.get("logging", {})
+        logs.configure(
+            log_file,
+            level=log_settings.get("level", logs.DEFAULT_LEVEL),
+            max_bytes=log_settings.get("max_bytes", logs.DEFAULT_MAX_BYTES),
+            backup_count=log_settings.get("backup_count", logs.DEFAULT_BACKUP_COUNT),
+            use_queue=log_settings.get("queue", False)
+        )
+
+    def create_latency_stats(self) -> LatencyStats:
+        stats_file = None
+        if self.settings.get("latency_stats", True):
+            stats_file = os.path.join(os.path.dirname(self.settings_file), 'cache', 'latency')
+        return LatencyStats(stats_file)
+
+    def create_listing_cache(self) -> ListingCache:
+        cache_settings = self.settings.get("listing_cache", {})
+        cache_dir = None
+        # A one-shot process starts with an empty memory cache, so only the
+        # disk cache can carry listings from one keystroke to the next
+        if cache_settings.get("persist", self.one_shot):
+            cache_dir = os.path.join(os.path.dirname(self.settings_file), 'cache')
+        return ListingCache(
+            max_entries=cache_settings.get("max_entries", 200000),
+            cache_dir=cache_dir,
+            max_disk_listings=cache_settings.get("max_disk_listings", 64)
+        )
+
+    def walk_options(self) -> "WalkOptions":
+        # '**' searches only: the walker and index modules are loaded on demand
+        from folderlist.walker import DEFAULT_EXCLUDED, WalkOptions
+        search_settings = self.settings.get("recursive_search", {})
+        return WalkOptions(
+            max_depth=search_settings.get("max_depth", 8),
+            max_entries=search_settings.get("max_entries", 200000),
+            workers=search_settings.get("workers", 8),
+            time_budget=search_settings.get("time_budget_ms", 2000) / 1000,
+            excluded=search_settings.get("exclude", DEFAULT_EXCLUDED)
+        )
+
+    def tree_index(self, path: str) -> Tuple[Optional["TreeIndex"], bool]:
+        """
+        The stored index of ``path``'s folder tree, or None if there is none
+        yet, and whether a background build or refresh of it is under way.
+        """
+        search_settings = self.settings.get("recursive_search", {})
+        if not search_settings.get("index", True):
+            return None, False
+        from folderlist.tree_index import BUILD_FAILED, BUILD_STARTED, build_in_background, index_file_for, load_index
+        index_dir = os.path.join(os.path.dirname(self.settings_file), 'cache', 'index')
+        index_file = index_file_for(index_dir, path)
+        try:
+            signature = file_signature(index_file)
+        except OSError:
+            signature = None
+        index = None
+        if signature is not None:
+            loaded = self.tree_indexes.get(index_file)
+            if loaded is not None and loaded[0] == signature:
+                index = loaded[1]
+            else:
+                index = load_index(index_file, path)
+                if index is not None:
+                    self.tree_indexes[index_file] = (signature, index)
+        
+        root = cache_key(path)
+        subfolders = root.rstrip(os.sep) + os.sep
+        changed = [key for key in self.changed_folders if key == root or key.startswith(subfolders)]
+        refreshing = False
+        if (index is None or changed
+                or index.age_ns() > search_settings.get("index_refresh_s", 300) * 1_000_000_000):
+            status = build_in_background(path, index_file, self.walk_options(),
+                                         search_settings.get("index_max_entries", 1000000))
+            refreshing = status != BUILD_FAILED
+            if status == BUILD_STARTED:
+                # A build already running may have read those folders before they changed
+                self.changed_folders.difference_update(changed)
+        return index, refreshing
+
+    def start_watching(self):
+        """
+        Keep cached listings current from filesystem change notifications;
+        only worthwhile in the long-lived server mode.
+        """
+        watch_settings = self.settings.get("watcher", {})
+        if not watch_settings.get("enabled", True):
+            return
+        from folderlist.watcher import create_watcher
+        watcher = create_watcher(
+            max_watches=watch_settings.get("max_watches", 256),
+            poll_interval=watch_settings.get("poll_interval_s", 2)
+        )
+        self.listing_cache.watcher = watcher
+        watched = 0
+        for path in self.settings["keywords"].values():
+            if watched >= watcher.max_watches // 2:
+                break  # leave room for the folders listed later
+            if self.listing_cache.watch(path):
+                watched += 1
+        logging.debug("Watching %d keyword folders with %s", watched, type(watcher).__name__)
+
+    def sync_changes(self):
+        """Apply the filesystem changes reported since the last request."""
+        for folder in self.listing_cache.sync():
+            self.changed_folders.add(cache_key(folder))
+
+    def read_settings_file(self) -> Optional[Dict[str, Any]]:
+        """The settings currently on disk, or None if there is no settings file."""
+        try:
+            with open(self.settings_file, 'r', encoding='utf-8') as f:
+                settings = json.load(f)
+        except FileNotFoundError:
+            return None
+        if not isinstance(settings, dict):
+            raise json.JSONDecodeError("Settings must be a JSON object", "", 0)
+        settings.setdefault("keywords", {})
+        return settings
 
     def save_settings(self):
         try:
-            with open(self.settings_file, 'w', encoding='utf-8') as f:
-                json.dump(self.settings, f, indent=4, ensure_ascii=False)
+            with file_lock(self.settings_file):
+                if self.pending_keywords:
+                    self.merge_settings_file()
+                atomic_write_json(self.settings_file, self.settings)
+            self.pending_keywords.clear()
             logging.debug("Settings saved successfully")
         except Exception as e:
-            logging.error(f"Error saving settings: {str(e)}")
+            logging.error("Error saving settings: %s", e)
             raise
 
+    def merge_settings_file(self):
+        """Apply our new keywords on top of whatever another plugin process saved meanwhile."""
+        try:
+            on_disk = self.read_settings_file()
+        except (OSError, ValueError) as e:
+            logging.warning("Not merging unreadable settings file: %s", e)
+            return
+        if on_disk is None:
+            return
+        keywords = on_disk["keywords"]
+        for keyword, path in self.pending_keywords.items():
+            keywords.setdefault(keyword, path)
+        self.settings = on_disk
+        self.keyword_index = KeywordIndex(keywords)
+
+    def add_keyword(self, keyword: str, path: str):
+        self.settings["keywords"][keyword] = path
+        self.keyword_index.add(keyword, path)
+        self.pending_keywords[keyword] = path
+
+    def flush_settings(self):
+        """Write the settings once if keywords were added during this request."""
+        if self.pending_keywords:
+            self.save_settings()
+
     def query(self, query: str) -> List[Dict[str, Any]]:
         try:
-            logging.debug(f"Received query: {query}")
+            logging.debug("Received query: %s", query)
             
             # If query is empty, show all current keywords
             if not query.strip():
                 return self.list_keywords()
             
+            # Plugin commands (:cache, :import, :export)
+            command_results = self.run_command(query.strip())
+            if command_results is not None:
+                return command_results
+            
             # Check if this is a keyword setting command (keyword : path)
             if ':' in query:
                 parts = query.split(':', 1)
@@ -111,17 +425,36 @@ class FolderListPlugin(FlowLauncher):
                             "IcoPath": "images/app.png"
                         }]
             
+            query, page = self.split_page(query)
+            
             # Check if this is a path
             if os.path.exists(query):
-                logging.debug(f"Query is a valid path: {query}")
-                return self.list_path_contents(query)
+                logging.debug("Query is a valid path: %s", query)
+                return self.list_path_contents(query, page)
             
-            # Check for keywords that start with the query
-            matching_keywords = [k for k in self.settings["keywords"].keys() if k.startswith(query.lower())]
+            # 'keyword filter' lists only the entries matching the filter,
+            # 'keyword ** filter' searches the keyword's whole folder tree
+            keyword_query, filter_text = self.split_keyword(query)
+            recursive = filter_text.startswith("**")
+            if recursive:
+                filter_text = filter_text[2:]
+            entry_filter = parse_filter(filter_text, self.settings.get("filter_mode", "substring"))
+            recursive = recursive and entry_filter is not None
+            
+            started = perf_counter_ns()
+            matching_keywords = self.match_keywords(keyword_query.lower(), exact=entry_filter is not None)
+            self.latency.lap("keywords", started)
             
             if matching_keywords:
                 results = []
-                for keyword in matching_keywords:
+                start, end = self.page_bounds(page)
+                total = 0
+                complete = True
+                listings = None
+                if not recursive and len(matching_keywords) > 1:
+                    listings = self.list_folders([self.settings["keywords"][keyword]
+                                                  for keyword, _ in matching_keywords])
+                for i, (keyword, keyword_score) in enumerate(matching_keywords):
                     path = self.settings["keywords"][keyword]
                     # Add the keyword option first with a special prefix to ensure it's first
                     results.append({
@@ -133,42 +466,26 @@ class FolderListPlugin(FlowLauncher):
                             "parameters": [path],
                             "dontHideAfterAction": False
                         },
-                        "Score": 1000  # High score to ensure it appears first
+                        "Score": KEYWORD_SCORE + keyword_score  # High score to ensure it appears first
                     })
                     
-                    # Add the contents of the path
+                    # Add the visible page of the path's contents
                     try:
-                        folders = []
-                        files = []
-                        for item in os.listdir(path):
-                            full_path = os.path.join(path, item)
-                            is_dir = os.path.isdir(full_path)
-                            
-                            result = {
-                                "Title": item,
-                                "SubTitle": f"{'Folder' if is_dir else 'File'}: {full_path}",
-                                "IcoPath": "images/folder.png" if is_dir else "images/file.png",
-                                "JsonRPCAction": {
-                                    "method": "open_path",
-                                    "parameters": [full_path],
-                                    "dontHideAfterAction": False
-                                },
-                                "Score": 100 if is_dir else 0  # Folders get higher score than files
-                            }
-                            
-                            if is_dir:
-                                folders.append(result)
-                            else:
-                                files.append(result)
-                        
-                        # Sort folders and files alphabetically
-                        folders.sort(key=lambda x: x["Title"].lower())
-                        files.sort(key=lambda x: x["Title"].lower())
-                        
-                        # Add folders first, then files
-                        results.extend(folders)
-                        results.extend(files)
-                            
+                        if recursive:
+                            index, refreshing = self.tree_index(path)
+                            page_entries = search_page(path, entry_filter, start, end, self.walk_options(),
+                                                       self.latency, index)
+                            results.append(self.index_result(path, index, refreshing))
+                        elif listings is None:
+                            page_entries = list_page(self.listing_cache, path, entry_filter, start, end, self.latency)
+                        elif listings[i].done.is_set():
+                            page_entries = rank_page(listings[i].result(), entry_filter, start, end, self.latency)
+                        else:
+                            results.append(self.pending_result(keyword, path))
+                            continue
+                        results.extend(self.entry_results(page_entries))
+                        total = max(total, page_entries.total)
+                        complete = complete and page_entries.complete
                     except PermissionError:
                         results.append({
                             "Title": "⚠️ Access Denied",
@@ -177,13 +494,15 @@ class FolderListPlugin(FlowLauncher):
                             "Score": 0
                         })
                     except Exception as e:
-                        logging.error(f"Error listing directory contents: {str(e)}")
+                        logging.error("Error listing directory contents: %s", e)
                         results.append({
                             "Title": "⚠️ Error listing contents",
                             "SubTitle": str(e),
                             "IcoPath": "images/app.png",
                             "Score": 0
                         })
+                if total > end or not complete:
+                    results.append(self.show_more_result(query, page, total, complete))
                 return results
             
             # If we get here, it's neither a path nor a matching keyword
@@ -194,12 +513,135 @@ class FolderListPlugin(FlowLauncher):
             }]
             
         except Exception as e:
-            logging.error(f"Error in query: {str(e)}")
+            logging.error("Error in query: %s", e)
             return [{
                 "Title": "Error",
                 "SubTitle": str(e),
                 "IcoPath": "images/app.png"
             }]
+        finally:
+            self.listing_cache.flush()
+
+    def run_command(self, text: str) -> Optional[List[Dict[str, Any]]]:
+        """Results for a ':command argument' query, or None if it is not a command."""
+        if not text.startswith(":"):
+            return None
+        command, _, argument = text[1:].partition(" ")
+        argument = os.path.expanduser(argument.strip().strip('"\''))
+        if command == "cache":
+            return self.cache_stats()
+        if command == "stats":
+            return self.latency_results()
+        if command == "import":
+            return self.import_preview(argument)
+        if command == "export":
+            return self.export_preview(argument)
+        return None
+
+    def import_preview(self, source: str) -> List[Dict[str, Any]]:
+        if not source:
+            return [{
+                "Title": "Import keywords",
+                "SubTitle": "Type a .json/.csv/keyword=path file, or a folder to register each subfolder",
+                "IcoPath": "images/app.png"
+            }]
+        if not os.path.exists(source):
+            return [{
+                "Title": "❌ Invalid path",
+                "SubTitle": f"Path does not exist: {source}",
+                "IcoPath": "images/app.png"
+            }]
+        
+        try:
+            from folderlist.bulk import plan_import, read_source
+            plan = plan_import(read_source(source), self.settings["keywords"], self.keyword_index)
+        except (OSError, ValueError) as e:
+            return [{
+                "Title": "⚠️ Cannot read import source",
+                "SubTitle": str(e),
+                "IcoPath": "images/app.png"
+            }]
+        
+        results = [{
+            "Title": f"📥 Import {len(plan.accepted)} keywords",
+            "SubTitle": f"From {source} · {len(plan.skipped)} skipped",
+            "IcoPath": "images/app.png",
+            "JsonRPCAction": {
+                "method": "import_keywords",
+                "parameters": [source],
+                "dontHideAfterAction": False
+            },
+            "Score": KEYWORD_SCORE
+        }]
+        for keyword, path, reason in plan.skipped[:IMPORT_PREVIEW_SKIPPED]:
+            results.append({
+                "Title": f"⚠️ Skipping '{keyword}'",
+                "SubTitle": reason,
+                "IcoPath": "images/app.png",
+                "Score": 0
+            })
+        return results
+
+    def export_preview(self, target: str) -> List[Dict[str, Any]]:
+        if not target:
+            return [{
+                "Title": "Export keywords",
+                "SubTitle": "Type a .json, .csv or text file to write all keywords to",
+                "IcoPath": "images/app.png"
+            }]
+        return [{
+            "Title": f"📤 Export {len(self.settings['keywords'])} keywords",
+            "SubTitle": f"To {target}",
+            "IcoPath": "images/app.png",
+            "JsonRPCAction": {
+                "method": "export_keywords",
+                "parameters": [target],
+                "dontHideAfterAction": False
+            }
+        }]
+
+    def cache_stats(self) -> List[Dict[str, Any]]:
+        stats = self.listing_cache.stats()
+        lookups = stats["hits"] + stats["misses"] + stats["refreshes"]
+        hit_rate = f"{stats['hits'] / lookups:.0%}" if lookups else "n/a"
+        return [{
+            "Title": f"Listing cache: {hit_rate} hit rate",
+            "SubTitle": (f"hits {stats['hits']} · misses {stats['misses']} · "
+                         f"refreshes {stats['refreshes']} · evictions {stats['evictions']}"),
+            "IcoPath": "images/app.png"
+        }, {
+            "Title": f"{stats['listings']} listings cached",
+            "SubTitle": (f"{stats['entries']} entries held in memory · {stats['live']} kept live by the watcher · "
+                         f"{stats['patches']} patched"),
+            "IcoPath": "images/app.png"
+        }]
+
+    def latency_results(self) -> List[Dict[str, Any]]:
+        results = []
+        for stage, samples, p50, p95, p99 in self.latency.summary():
+            results.append({
+                "Title": f"{stage}: p50 {format_ns(p50)} · p95 {format_ns(p95)} · p99 {format_ns(p99)}",
+                "SubTitle": f"{samples} samples",
+                "IcoPath": "images/app.png"
+            })
+        if not results:
+            results.append({
+                "Title": "No latency samples yet",
+                "SubTitle": "Timings are collected as you use the plugin",
+                "IcoPath": "images/app.png"
+            })
+        results.extend(self.cache_stats())
+        results.append({
+            "Title": "Reset latency stats",
+            "SubTitle": "Discard the collected timings",
+            "IcoPath": "images/app.png",
+            "JsonRPCAction": {
+                "method": "reset_stats",
+                "parameters": [],
+                "dontHideAfterAction": False
+            }
+        })
+        return results
 
     def list_keywords(self) -> List[Dict[str, Any]]:
         results = []
@@ -224,8 +666,8 @@ class FolderListPlugin(FlowLauncher):
         
         return results
 
-    def list_path_contents(self, path: str) -> List[Dict[str, Any]]:
-        logging.debug(f"Listing contents of path: {path}")
+    def list_path_contents(self, path: str, page: int = 1) -> List[Dict[str, Any]]:
+        logging.debug("Listing contents of path: %s", path)
         
         if not os.path.exists(path):
             return [{
@@ -234,39 +676,15 @@ class FolderListPlugin(FlowLauncher):
                 "IcoPath": "images/app.png"
             }]
         
-        folders = []
-        files = []
         try:
-            for item in os.listdir(path):
-                full_path = os.path.join(path, item)
-                is_dir = os.path.isdir(full_path)
-                
-                result = {
-                    "Title": item,
-                    "SubTitle": f"{'Folder' if is_dir else 'File'}: {full_path}",
-                    "IcoPath": "images/folder.png" if is_dir else "images/file.png",
-                    "JsonRPCAction": {
-                        "method": "open_path",
-                        "parameters": [full_path],
-                        "dontHideAfterAction": False
-                    }
-                }
-                
-                if is_dir:
-                    folders.append(result)
-                else:
-                    files.append(result)
-                
-                logging.debug(f"Added result for: {item}")
-            
-            # Sort folders and files alphabetically
-            folders.sort(key=lambda x: x["Title"].lower())
-            files.sort(key=lambda x: x["Title"].lower())
+            start, end = self.page_bounds(page)
+            page_entries = list_page(self.listing_cache, path, None, start, end, self.latency)
+            results = self.entry_results(page_entries)
             
-            # Combine results with folders first, then files
-            results = folders + files
+            if page_entries.total > end:
+                results.append(self.show_more_result(path, page, page_entries.total))
             
-            logging.debug(f"Total results: {len(results)}")
+            logging.debug("Total results: %d of %d entries", len(results), page_entries.total)
             return results
             
         except PermissionError:
@@ -276,34 +694,179 @@ class FolderListPlugin(FlowLauncher):
                 "IcoPath": "images/app.png"
             }]
         except Exception as e:
-            logging.error(f"Error listing directory: {str(e)}")
+            logging.error("Error listing directory: %s", e)
             return [{
                 "Title": "Error",
                 "SubTitle": f"Failed to list directory: {str(e)}",
                 "IcoPath": "images/app.png"
             }]
 
+    def list_folders(self, paths: List[str]) -> list:
+        """
+        List several keyword folders concurrently and return a ``ListingJob``
+        per path, waiting at most the time budget for them. The rest are
+        shown as still listing: a long-lived process shows them once they
+        are read, a one-shot process leaves them in the persistent cache for
+        the next keystroke (``finish_listings``).
+        """
+        started = perf_counter_ns()
+        listing_settings = self.settings.get("parallel_listing", {})
+        if self.listing_pool is None:
+            from folderlist.fanout import ListingPool
+            self.listing_pool = ListingPool(self.listing_cache, listing_settings.get("workers", 4))
+        jobs = self.listing_pool.list_all(paths, listing_settings.get("time_budget_ms", 1000) / 1000)
+        self.latency.lap("enumerate", started)
+        return jobs
+
+    def split_keyword(self, query: str) -> Tuple[str, str]:
+        """
+        Split 'keyword filter' into the keyword part and the filter text.
+
+        Keywords may contain spaces ('my docs'), so the longest such keyword
+        the query starts with is kept whole, and a query that is still the
+        start of one (while it is being typed) has no filter yet.
+        """
+        keyword_query, space, filter_text = query.partition(" ")
+        if not space:
+            return query, ""
+        lookup = query.lower()
+        spaced = self.keyword_index.with_prefix(keyword_query.lower() + " ")
+        if spaced:
+            for keyword in sorted(spaced, key=len, reverse=True):
+                if lookup == keyword or lookup.startswith(keyword + " "):
+                    return keyword, lookup[len(keyword) + 1:]
+            if self.keyword_index.with_prefix(lookup):
+                return query, ""
+        return keyword_query, filter_text
+
+    def match_keywords(self, lookup: str, exact: bool = False) -> List[Tuple[str, int]]:
+        """
+        Return ``(keyword, score)`` pairs for a lowercased keyword query, best first.
+
+        Keywords starting with the query win; if there are none, keywords the
+        query fuzzily matches (e.g. 'tlf' for 'throne-lang-frontend') are used.
+        With ``exact``, an exactly matching keyword is returned on its own.
+        """
+        keywords = self.settings["keywords"]
+        if exact and lookup in keywords:
+            return [(lookup, fuzzy.score(lookup, lookup))]
+        
+        # Check for keywords that start with the query
+        matching = self.keyword_index.with_prefix(lookup)
+        if matching:
+            scored = [(k, fuzzy.score(lookup, k) or 0) for k in matching]
+        elif lookup:
+            index = self.keyword_index.fuzzy_index()
+            scored = [(index.names[i], score) for i, score in index.search(lookup)]
+        else:
+            return []
+        scored.sort(key=lambda item: -item[1])
+        return scored
+
+    def split_page(self, query: str) -> Tuple[str, int]:
+        """Split a trailing page marker off a query: 'cat #3' -> ('cat', 3)."""
+        head, marker, number = query.rpartition(" #")
+        if marker and number.isdigit() and int(number) > 0:
+            return head.rstrip(), int(number)
+        return query, 1
+
+    def page_bounds(self, page: int) -> Tuple[int, int]:
+        limit = max(1, int(self.settings.get("max_results", 100)))
+        return (page - 1) * limit, page * limit
+
+    def entry_results(self, page_entries: Page) -> List[Fragment]:
+        """Materialize the visible page as pre-encoded Flow Launcher results."""
+        started = perf_counter_ns()
+        results = [entry_fragment(entry.name, entry.path, entry.is_dir, score)
+                   for entry, score in page_entries.rows]
+        self.latency.lap("build", started)
+        return results
+
+    def index_result(self, path: str, index: Optional["TreeIndex"], refreshing: bool) -> Dict[str, Any]:
+        if index is None:
+            title = "🗂️ Indexing subfolders" if refreshing else "🗂️ No subfolder index"
+            subtitle = f"Searching {path} directly until its index is ready"
+        else:
+            title = f"🗂️ Index: {index.entry_count} entries{'' if index.complete else '+'}"
+            subtitle = f"Updated {format_age(index.age_ns())} ago{', refreshing' if refreshing else ''}"
+        return {
+            "Title": title,
+            "SubTitle": subtitle,
+            "IcoPath": "images/app.png",
+            "Score": -2  # Below the entries and "Show more"
+        }
+
+    def pending_result(self, keyword: str, path: str) -> Dict[str, Any]:
+        return {
+            "Title": f"⏳ Still listing {keyword}",
+            "SubTitle": f"{path} is slow to respond; its entries show up once it is read",
+            "IcoPath": "images/app.png",
+            "Score": 0
+        }
+
+    def settings_warning_result(self, backup: str) -> Dict[str, Any]:
+        return {
+            "Title": "⚠️ settings.json was damaged and has been replaced",
+            "SubTitle": f"Your keywords were saved in {backup}. Select to open its folder and dismiss this warning.",
+            "IcoPath": "images/app.png",
+            "JsonRPCAction": {
+                "method": "dismiss_settings_warning",
+                "parameters": [backup],
+                "dontHideAfterAction": False
+            },
+            "Score": KEYWORD_SCORE * 2  # Above everything until dismissed
+        }
+
+    def show_more_result(self, query: str, page: int, total: int, complete: bool = True) -> Dict[str, Any]:
+        start, end = self.page_bounds(page)
+        action_keyword = self.settings.get("action_keyword", "folder")
+        return {
+            "Title": f"⏬ Show more (page {page + 1})",
+            "SubTitle": f"Showing {start + 1}-{min(end, total)} of {total}{'' if complete else '+'} entries",
+            "IcoPath": "images/app.png",
+            "JsonRPCAction": {
+                "method": "Flow.Launcher.ChangeQuery",
+                "parameters": [f"{action_keyword} {query} #{page + 1}", True],
+                "dontHideAfterAction": True
+            },
+            "Score": -1  # Keep it below every listed entry
+        }
+
+    def context_menu(self, data) -> List[Dict[str, Any]]:
+        return []
+
+    def debug(self, msg: str):
+        """Show ``msg`` in Flow Launcher's debug output for this request."""
+        self.debugMessage = msg
+
     def run(self, query: str) -> None:
         try:
-            logging.debug(f"Run method called with query: {query}")
+            logging.debug("Run method called with query: %s", query)
         except Exception as e:
-            logging.error(f"Error in run method: {str(e)}")
+            logging.error("Error in run method: %s", e)
             raise
 
+    def dismiss_settings_warning(self, backup: str) -> None:
+        with file_lock(self.settings_file):
+            settings = self.read_settings_file() or self.settings
+            settings.pop("corrupt_settings_backup", None)
+            atomic_write_json(self.settings_file, settings)
+        self.open_path(os.path.dirname(backup))
+
     def open_path(self, path: str) -> None:
         try:
-            logging.debug(f"Opening path: {path}")
+            logging.debug("Opening path: %s", path)
             os.startfile(path)
         except PermissionError:
-            logging.error(f"Permission denied when opening path: {path}")
+            logging.error("Permission denied when opening path: %s", path)
             raise
         except Exception as e:
-            logging.error(f"Error opening path: {str(e)}")
+            logging.error("Error opening path: %s", e)
             raise
 
     def set_keyword(self, keyword: str, path: str) -> None:
         try:
-            logging.debug(f"Setting keyword '{keyword}' for path: {path}")
+            logging.debug("Setting keyword '%s' for path: %s", keyword, path)
             keyword = keyword.lower()
             
             # Check if keyword already exists
@@ -311,22 +874,57 @@ class FolderListPlugin(FlowLauncher):
                 raise ValueError(f"Keyword '{keyword}' already exists")
             
             # Check if path already exists with a different keyword
-            for existing_keyword, existing_path in self.settings["keywords"].items():
-                if existing_path == path:
-                    raise ValueError(f"Path already exists with keyword '{existing_keyword}'")
+            existing_keyword = self.keyword_index.keyword_for_path(path)
+            if existing_keyword is not None:
+                raise ValueError(f"Path already exists with keyword '{existing_keyword}'")
             
-            self.settings["keywords"][keyword] = path
-            self.save_settings()
+            self.add_keyword(keyword, path)
+        except Exception as e:
+            logging.error("Error setting keyword: %s", e)
+            raise
+
+    def import_keywords(self, source: str) -> None:
+        try:
+            logging.debug("Importing keywords from: %s", source)
+            from folderlist.bulk import plan_import, read_source
+            plan = plan_import(read_source(source), self.settings["keywords"], self.keyword_index)
+            for keyword, path in plan.accepted:
+                self.add_keyword(keyword, path)
+            for keyword, path, reason in plan.skipped:
+                logging.warning("Skipped importing '%s': %s", keyword, reason)
+            logging.debug("Imported %d keywords, skipped %d", len(plan.accepted), len(plan.skipped))
         except Exception as e:
-            logging.error(f"Error setting keyword: {str(e)}")
+            logging.error("Error importing keywords: %s", e)
             raise
 
+    def reset_stats(self) -> None:
+        self.latency.reset()
+
+    def export_keywords(self, target: str) -> None:
+        try:
+            logging.debug("Exporting keywords to: %s", target)
+            from folderlist.bulk import write_export
+            write_export(target, self.settings["keywords"])
+        except Exception as e:
+            logging.error("Error exporting keywords: %s", e)
+            raise
+
+
+# Built once at import: method name -> plain function, no per-request introspection
+RPC_TABLE = {name: getattr(FolderListPlugin, name) for name in RPC_METHODS}
+
 if __name__ == "__main__":
     try:
         logging.debug("Starting FolderListPlugin")
-        plugin = FolderListPlugin()
+        if len(sys.argv) == 1 or "--server" in sys.argv[1:]:
+            # Flow Launcher's v2 host starts the plugin once, without arguments, and
+            # talks JSON-RPC over stdio; a v1 host passes each request as argv[1]
+            from folderlist.server import serve
+            serve(FolderListPlugin(dispatch=False))
+        else:
+            plugin = FolderListPlugin()
     except Exception as e:
-        logging.critical(f"Critical error in plugin: {str(e)}")
+        logging.critical("Critical error in plugin: %s", e)
         print(json.dumps({
             "result": [{
                 "Title": "Critical Error",
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""ListingCache behaviour with a watcher attached (server mode)."""
+
+import os
+
+from folderlist.cache import ListingCache, cache_key
+from folderlist.watcher import ADDED, Change, Watcher
+
+
+class ScriptedWatcher(Watcher):
+    """Watches nothing for real; reports the changes a test queues."""
+
+    def __init__(self, max_watches: int = 256):
+        super().__init__(max_watches)
+        self.pending = []
+
+    def _add(self, key, path):
+        return object()
+
+    def _remove(self, handle):
+        pass
+
+    def _read(self):
+        pending, self.pending = self.pending, []
+        return pending
+
+
+def make_folder(root, name, files):
+    folder = root / name
+    folder.mkdir()
+    for file_name in files:
+        (folder / file_name).write_text("")
+    # Outside the racy mtime window, so the listings are cached as current
+    os.utime(folder, ns=(0, 0))
+    return str(folder)
+
+
+def test_sync_skips_listings_evicted_while_patching(tmp_path):
+    first = make_folder(tmp_path, "a", ["1", "2"])
+    second = make_folder(tmp_path, "b", ["1", "2"])
+    watcher = ScriptedWatcher()
+    cache = ListingCache(max_entries=4)
+    cache.watcher = watcher
+    cache.get(first)
+    cache.get(second)
+    assert cache.stats()["live"] == 2
+
+    # Patching the first listing to 3 entries evicts the second one
+    watcher.pending = [Change(cache_key(first), first, ADDED, "3"),
+                       Change(cache_key(second), second, ADDED, "3")]
+    assert cache.sync() == [first, second]
+
+    stats = cache.stats()
+    assert stats["patches"] == 1
+    assert stats["evictions"] == 1
+    assert stats["live"] == 1
+    assert sorted(entry.name for entry in cache.get(first)) == ["1", "2", "3"]
+    # Not served stale from the watch: the evicted folder is read again
+    (tmp_path / "b" / "3").write_text("")
+    assert sorted(entry.name for entry in cache.get(second)) == ["1", "2", "3"]
+    assert cache.stats()["misses"] == 3
+
+
+def test_live_hits_keep_the_folder_watched(tmp_path):
+    hot = make_folder(tmp_path, "hot", ["1"])
+    others = [make_folder(tmp_path, f"other{i}", ["1"]) for i in range(3)]
+    watcher = ScriptedWatcher(max_watches=3)
+    cache = ListingCache()
+    cache.watcher = watcher
+    cache.get(hot)
+    for other in others:
+        cache.get(other)
+        cache.get(hot)
+    assert watcher.is_watching(cache_key(hot))
+    assert cache.stats()["refreshes"] == 0